@@ -3,27 +3,174 @@ import os
 import cv2
 import numpy as np
 import sys
+import shutil
+import tempfile
+import subprocess
+import time
+import traceback
+import json
+import hashlib
+import socket
+import threading
+import collections
+import tracemalloc
+from concurrent import futures
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.connection import Listener
+
+# painter_common.py ships with the add-on package; the add-on passes its directory down,
+# and a checkout or batch setup has the package next to this script
+sys.path.insert(0, os.environ.get('AUTO_PAINTER_COMMON_DIR') or
+                os.path.join(os.path.dirname(os.path.abspath(__file__)), 'auto_painter_addon'))
+import painter_common
+from painter_common import span, flush_trace, trace_child_env, trace_summary, estimate_paint_memory
+
+try:
+    import resource
+except ImportError:
+    # Windows: no high-water mark, only what /proc or the sampler sees
+    resource = None
+
+# set by a painter worker to stream log messages to the add-on as progress
+progress_hook = None
+
+log_handle = None
 
 def log(message):
-    log_file = "/Users/barrett/Tristan/Projects/Blender/Thesis/auto-painter/addon.log"
-    with open(log_file, "a") as f:
-        f.write(message + "\n")
+    # keep the log open for the whole run instead of reopening it per message
+    global log_handle
+    if log_handle is None:
+        log_handle = open(painter_common.LOG_FILE, "a", buffering=1)
+    log_handle.write(message + "\n")
+    if progress_hook is not None:
+        progress_hook(message)
 
-def correct_colors_advanced(original_img, modified_img):
-    # [0] convert images to HSV
-    hsv_original = cv2.cvtColor(original_img, cv2.COLOR_BGR2HSV).astype(np.float32)
-    hsv_modified = cv2.cvtColor(modified_img, cv2.COLOR_BGR2HSV).astype(np.float32)
+# ------------------ TRACING ------------------
 
-    # [1] normalize HSV values to range [0, 1] for calculations
-    hsv_original /= [180, 255, 255]
-    hsv_modified /= [180, 255, 255]
+def record_startup_span():
+    # time from the parent's Popen to this script running covers Blender startup and imports
+    spawn_time = os.environ.get('AUTO_PAINTER_SPAWN_TIME')
+    if not spawn_time:
+        return
+    spawn_time = float(spawn_time)
+    painter_common.trace_events.append({
+        'name': 'blender_startup',
+        'ph': 'X',
+        'ts': int(spawn_time * 1e6),
+        'dur': int((time.time() - spawn_time) * 1e6),
+        'pid': os.getpid(),
+        'tid': 0,
+        'args': {'trace_id': painter_common.trace_id},
+    })
+
+# ------------------ MEMORY ------------------
+
+# how often the monitor thread samples resident memory, so short spikes inside a stage are seen
+MEMORY_SAMPLE_INTERVAL = 0.05
+# tracing allocations costs a little per allocation, so the numpy peaks are opt-in
+TRACE_ALLOCATIONS = os.environ.get('AUTO_PAINTER_TRACE_ALLOCATIONS') == '1'
+
+# highest RSS the monitor has seen since the innermost open span started
+memory_state = {'peak': 0}
+memory_monitor = None
+# [rss, allocations] peaks of the spans open on the main thread, outermost first
+open_span_peaks = []
+
+def current_rss():
+    # resident bytes from /proc where there is one, else the process high-water mark
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        pass
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
 
-    # [2] define the thresholds for hue, saturation, and value differences
-    hue_threshold = 0.04 # 0.4%
-    sat_threshold = 0.12 # 1.2%
-    val_threshold = 0.12 # 1.2%
+def start_memory_monitor():
+    global memory_monitor
+    if memory_monitor is not None:
+        return
+
+    def sample():
+        while True:
+            memory_state['peak'] = max(memory_state['peak'], current_rss())
+            time.sleep(MEMORY_SAMPLE_INTERVAL)
+
+    memory_monitor = threading.Thread(target=sample, name='auto_painter_memory', daemon=True)
+    memory_monitor.start()
+    if TRACE_ALLOCATIONS and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+def fold_memory_peaks():
+    # hand the peaks since the last reset to every open span, since they all contain that stretch
+    rss = max(memory_state['peak'], current_rss())
+    allocations = tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else 0
+    for peaks in open_span_peaks:
+        peaks[0] = max(peaks[0], rss)
+        peaks[1] = max(peaks[1], allocations)
+
+def open_memory_span():
+    fold_memory_peaks()
+    memory_state['peak'] = current_rss()
+    if tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+    peaks = [memory_state['peak'], 0]
+    open_span_peaks.append(peaks)
+    return peaks
+
+def close_memory_span(peaks):
+    fold_memory_peaks()
+    # by identity, two spans can hold equal peaks
+    del open_span_peaks[next(index for index, open_peaks in enumerate(open_span_peaks) if open_peaks is peaks)]
+    memory = {'rss_mib': round(current_rss() / 2 ** 20, 1), 'peak_rss_mib': round(peaks[0] / 2 ** 20, 1)}
+    if tracemalloc.is_tracing():
+        memory['alloc_peak_mib'] = round(peaks[1] / 2 ** 20, 1)
+    return memory
+
+painter_common.memory_span_hooks = (open_memory_span, close_memory_span)
+
+def memory_summary(events, budget=0):
+    # per-stage memory of the spans recorded in this process since the last flush
+    stages = {}
+    for event in events:
+        if 'peak_rss_mib' not in event['args']:
+            continue
+        peak, rss, allocations = stages.get(event['name'], (0, 0, 0))
+        stages[event['name']] = (max(peak, event['args']['peak_rss_mib']), max(rss, event['args']['rss_mib']),
+                                 max(allocations, event['args'].get('alloc_peak_mib', 0)))
+
+    lines = [f"{'stage':<24}{'peak MiB':>10}{'after MiB':>11}{'numpy MiB':>11}"]
+    for name, (peak, rss, allocations) in sorted(stages.items(), key=lambda item: -item[1][0]):
+        lines.append(f"{name:<24}{peak:>10.0f}{rss:>11.0f}{allocations:>11.0f}")
+    peak = max((stage[0] for stage in stages.values()), default=0)
+    if budget > 0 and peak > budget:
+        lines.append(f"peak {peak:.0f} MiB is over the {budget} MiB budget; the cost model underestimates this job")
+    return "\n".join(lines)
+
+def check_memory_budget(resolution, options):
+    # refuse a job up front instead of having it killed halfway through the render
+    budget = options['memory_budget']
+    if budget <= 0:
+        return
+    needed = estimate_paint_memory(resolution, options['render_tiles'], options['render_workers']) / 2 ** 20
+    if needed > budget:
+        raise MemoryError(f"Painting at {resolution}px with {options['render_tiles']}x{options['render_tiles']} tiles "
+                          f"needs about {needed:.0f} MiB, over the {budget} MiB memory budget")
+    log(f"Estimated memory {needed:.0f} MiB of the {budget} MiB budget")
+
+# HSV thresholds are fractions of the normalized [0, 1] range
+HUE_THRESHOLD = 0.04 # 0.4%
+SAT_THRESHOLD = 0.12 # 1.2%
+VAL_THRESHOLD = 0.12 # 1.2%
+HSV_THRESHOLDS = (HUE_THRESHOLD, SAT_THRESHOLD, VAL_THRESHOLD)
+
+def _correct_hsv_loop(hsv_original, hsv_modified, thresholds=HSV_THRESHOLDS):
+    # reference implementation, kept for parity checks against the vectorized path
+    hue_threshold, sat_threshold, val_threshold = thresholds
 
-    # [3] HSV correction loop
     for i in range(hsv_original.shape[0]):
         for j in range(hsv_original.shape[1]):
             # calculate the hue difference
@@ -49,151 +196,1362 @@ def correct_colors_advanced(original_img, modified_img):
             # assign corrected values to modified image
             hsv_modified[i, j] = corrected_hsv * [180, 255, 255]
 
-    # [4] convert corrected HSV back to BGR and uint8
+    return hsv_modified
+
+def _correct_hsv_vectorized(hsv_original, hsv_modified, thresholds=HSV_THRESHOLDS):
+    # same clamps as _correct_hsv_loop on whole arrays, kept in float32 like the loop
+    hue_threshold, sat_threshold, val_threshold = (np.float32(threshold) for threshold in thresholds)
+    h_o, s_o, v_o = hsv_original[..., 0], hsv_original[..., 1], hsv_original[..., 2]
+    h_m, s_m, v_m = hsv_modified[..., 0], hsv_modified[..., 1], hsv_modified[..., 2]
+
+    # circular hue difference
+    h_delta = h_m - h_o
+    h_diff = h_delta % np.float32(1)
+    h_diff = np.where(h_diff > 0.5, h_diff - np.float32(1), h_diff)
+    h_diff = np.abs(h_diff)
+
+    s_delta = s_m - s_o
+    v_delta = v_m - v_o
+
+    corrected = hsv_modified.copy()
+    corrected[..., 0] = np.where(h_diff > hue_threshold, (h_o + np.sign(h_delta) * hue_threshold) % np.float32(1), h_m)
+    corrected[..., 1] = np.where(np.abs(s_delta) > sat_threshold, s_o + np.sign(s_delta) * sat_threshold, s_m)
+    corrected[..., 2] = np.where(np.abs(v_delta) > val_threshold, np.clip(v_o + np.sign(v_delta) * val_threshold, 0, 1), v_m)
+
+    # the loop scales back in float64 before storing into the float32 buffer
+    return (corrected * np.array([180, 255, 255])).astype(np.float32)
+
+CORRECTION_ENGINES = {
+    'vectorized': _correct_hsv_vectorized,
+    'loop': _correct_hsv_loop,
+}
+
+# largest angle, in degrees, the vector engine lets a painted normal turn away from the baked one
+MAX_NORMAL_ANGLE = 10.0
+# pixels per chunk in the vector engine, small enough for its float32 temporaries to stay in cache
+VECTOR_CHUNK_PIXELS = 32768
+CHANNEL_SUM = np.ones((1, 3), dtype=np.float32)
+
+def _correct_normals_chunk(original_img, modified_img, cos_max, sin_max):
+    # [0] decode both maps from [0, 255] to [-1, 1] float32 vectors
+    original = cv2.addWeighted(original_img, 2 / 255, original_img, 0, -1, dtype=cv2.CV_32F)
+    modified = cv2.addWeighted(modified_img, 2 / 255, modified_img, 0, -1, dtype=cv2.CV_32F)
+    inv_original = 1 / np.sqrt(np.maximum(cv2.transform(cv2.multiply(original, original), CHANNEL_SUM), np.float32(1e-12)))
+    inv_modified = 1 / np.sqrt(np.maximum(cv2.transform(cv2.multiply(modified, modified), CHANNEL_SUM), np.float32(1e-12)))
+    cos_angle = cv2.transform(cv2.multiply(original, modified), CHANNEL_SUM)
+    cos_angle *= inv_original
+    cos_angle *= inv_modified
+    sin_angle = np.sqrt(np.maximum(1 - cos_angle * cos_angle, 0))
+
+    # [1] normals further than max_angle from the baked one are turned back onto that cone:
+    #     unit(original) * cos_max + (unit(modified) - unit(original) * cos) / sin * sin_max,
+    #     i.e. original * alpha + modified * beta with both weights per pixel
+    over = cos_angle < cos_max
+    # a normal pointing straight back has no direction to turn in, so it keeps the baked one
+    turnable = sin_angle > 1e-6
+    beta = np.where(over, np.where(turnable, sin_max / np.maximum(sin_angle, np.float32(1e-6)), 0), 1).astype(np.float32)
+    alpha = np.where(over, np.where(turnable, cos_max - cos_angle * beta, 1), 0).astype(np.float32)
+    alpha *= inv_original
+    beta *= inv_modified
+    original *= alpha[..., None]
+    modified *= beta[..., None]
+    modified += original
+
+    # [2] re-encode to uint8 with rounding, keeping the black background black
+    corrected = cv2.convertScaleAbs(modified, alpha=127.5, beta=127.5)
+    corrected[cv2.transform(original_img, CHANNEL_SUM) == 0] = 0
+    return corrected
+
+def correct_normals_vector(original_img, modified_img, max_angle=MAX_NORMAL_ANGLE):
+    # clamp the angle between painted and baked normals per pixel, without going through HSV
+    cos_max = np.float32(np.cos(np.radians(max_angle)))
+    sin_max = np.float32(np.sin(np.radians(max_angle)))
+    corrected = np.empty(original_img.shape, dtype=np.uint8)
+    rows = max(1, VECTOR_CHUNK_PIXELS // original_img.shape[1])
+    for start in range(0, original_img.shape[0], rows):
+        chunk = slice(start, start + rows)
+        corrected[chunk] = _correct_normals_chunk(np.ascontiguousarray(original_img[chunk]),
+                                                  np.ascontiguousarray(modified_img[chunk]), cos_max, sin_max)
+    return corrected
+
+def correct_colors_advanced(original_img, modified_img, engine='vectorized', max_angle=MAX_NORMAL_ANGLE, thresholds=HSV_THRESHOLDS):
+    # the vector engine clamps the decoded normals directly, without the HSV round trip
+    if engine == 'vector':
+        return correct_normals_vector(original_img, modified_img, max_angle)
+
+    # [0] convert images to HSV
+    hsv_original = cv2.cvtColor(original_img, cv2.COLOR_BGR2HSV).astype(np.float32)
+    hsv_modified = cv2.cvtColor(modified_img, cv2.COLOR_BGR2HSV).astype(np.float32)
+
+    # [1] normalize HSV values to range [0, 1] for calculations
+    hsv_original /= [180, 255, 255]
+    hsv_modified /= [180, 255, 255]
+
+    # [2] clamp hue, saturation and value differences to the thresholds
+    if engine not in CORRECTION_ENGINES:
+        raise ValueError(f"Unknown correction engine: {engine}")
+    hsv_modified = CORRECTION_ENGINES[engine](hsv_original, hsv_modified, thresholds)
+
+    # [3] convert corrected HSV back to BGR and uint8
     corrected_img_bgr = cv2.cvtColor(hsv_modified.astype(np.uint8), cv2.COLOR_HSV2BGR)
     return corrected_img_bgr
 
-def paint_normal_map(resolution_arg, samples_arg, seed):
-    log("Starting NORMAL MAP painting...")
-    current_blend_dir = os.path.dirname(bpy.data.filepath)
-    blender_file_path = os.path.join(current_blend_dir, 'painter.blend')
-    image_path = os.path.join(current_blend_dir, 'normals.png')
-    output_path = os.path.join(current_blend_dir, 'painted.png')
-    mask_path = os.path.join(current_blend_dir, 'masked.png')
+# rows processed per strip by the post-render stages
+STRIP_ROWS = 256
+
+# tile edge in pixels for the coverage index, 0 processes every pixel
+COVERAGE_TILE = 128
+
+# PNG zlib level per artifact class, None keeps cv2's fast default: intermediates are written for speed,
+# deliverables small (level 6 shrinks smooth maps by about 40% for 3x the encode time)
+PNG_COMPRESSION = {
+    'intermediate': None,
+    'final': 6,
+}
+# threads encoding and decoding images next to the paint stages
+IO_THREADS = 2
+
+def parse_flag(value):
+    return str(value).lower() in ('1', 'true', 'yes')
+
+# optional paint settings shared by the command line, worker jobs and batches: name -> (default, type)
+PAINT_OPTIONS = {
+    'correction_engine': ('vectorized', str),
+    'strip_rows': (STRIP_ROWS, int),
+    'threads': (0, int),
+    'work_dir': (None, str),
+    'debug_intermediates': (False, parse_flag),
+    'coverage_tile': (COVERAGE_TILE, int),
+    'render_tiles': (1, int),
+    'render_workers': (0, int),
+    'tile_queue': (None, str),
+    'noise_threshold': (None, float),
+    'min_samples': (0, int),
+    'output_suffix': ('', str),
+    'color_preset': ('default', str),
+    'cycles_profile': ('auto', str),
+    'max_angle': (MAX_NORMAL_ANGLE, float),
+    'hue_threshold': (HUE_THRESHOLD, float),
+    'sat_threshold': (SAT_THRESHOLD, float),
+    'val_threshold': (VAL_THRESHOLD, float),
+    'incremental': (False, parse_flag),
+    'intermediate_compression': (PNG_COMPRESSION['intermediate'], int),
+    'final_compression': (PNG_COMPRESSION['final'], int),
+    'intermediate_format': ('png', str),
+    'memory_budget': (0, int),
+}
+
+def read_paint_options(lookup):
+    # lookup(name) returns the raw value or None, e.g. from cli args or a job dict
+    options = {}
+    for name, (default, convert) in PAINT_OPTIONS.items():
+        value = lookup(name)
+        options[name] = default if value is None else convert(value)
+    return options
+
+def create_memmap(scratch_dir, name, shape, dtype):
+    return np.memmap(os.path.join(scratch_dir, f"{name}.raw"), dtype=dtype, mode='w+', shape=shape)
+
+def load_image_memmap(path, flags, scratch_dir, name):
+    # decode once, then keep the pixels in a disk-backed buffer that later stages page through
+    image = cv2.imread(path, flags)
+    buffer = create_memmap(scratch_dir, name, image.shape, image.dtype)
+    buffer[:] = image
+    del image
+    return buffer
+
+def iter_strips(height, strip_rows):
+    if strip_rows <= 0:
+        strip_rows = height
+    for start in range(0, height, strip_rows):
+        yield slice(start, min(start + strip_rows, height))
+
+# ------------------ IMAGE I/O ------------------
+
+io_pool = None
+pending_writes = []
+# bytes written and encode seconds per artifact class since the last report
+io_stats = collections.defaultdict(lambda: {'files': 0, 'bytes': 0, 'seconds': 0.0})
+io_stats_lock = threading.Lock()
+
+def io_executor():
+    global io_pool
+    if io_pool is None:
+        io_pool = ThreadPoolExecutor(max_workers=IO_THREADS, thread_name_prefix='auto_painter_io')
+    return io_pool
+
+def intermediate_path(base, options):
+    # debug intermediates as PNG to open anywhere, or as uncompressed TIFF to write about 10x faster
+    return base + ('.tif' if options['intermediate_format'] == 'tiff' else '.png')
+
+def image_write_params(path, level):
+    if path.endswith('.tif'):
+        return [cv2.IMWRITE_TIFF_COMPRESSION, 1]
+    if level is None:
+        return []
+    return [cv2.IMWRITE_PNG_COMPRESSION, level]
+
+def write_image(path, image, artifact, options, on_written=None):
+    # encode on an I/O thread while the next stage runs; the image is written as is, so the caller
+    # must not change it afterwards, and scratch memmaps are only removed by remove_after_writes
+    params = image_write_params(path, options[f'{artifact}_compression'])
+    pixels = [image]
+
+    def encode():
+        start = time.perf_counter()
+        root, extension = os.path.splitext(path)
+        temp_path = f'{root}.{os.getpid()}.tmp{extension}'
+        with span('image_write', artifact=artifact, file=os.path.basename(path)):
+            try:
+                if not cv2.imwrite(temp_path, pixels[0], params):
+                    raise IOError(f"Could not write {path}")
+            finally:
+                # let go of the memmap right away, so its scratch file can be removed on any platform
+                pixels.clear()
+            os.replace(temp_path, path)
+        with io_stats_lock:
+            stats = io_stats[artifact]
+            stats['files'] += 1
+            stats['bytes'] += os.path.getsize(path)
+            stats['seconds'] += time.perf_counter() - start
+        if on_written is not None:
+            on_written()
+
+    pending_writes.append(io_executor().submit(encode))
+
+def remove_after_writes(scratch_dir):
+    # queued behind the writes already submitted, so memmaps they still read are removed only once written;
+    # those writes were taken off the queue first, so this never waits on a write stuck behind it
+    writes = list(pending_writes)
+
+    def remove():
+        futures.wait(writes)
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+
+    pending_writes.append(io_executor().submit(remove))
+
+def finish_image_writes():
+    # wait for every queued write, then report what the writes cost; the first failed write is raised
+    start = time.perf_counter()
+    errors = []
+    while pending_writes:
+        error = pending_writes.pop(0).exception()
+        if error is not None:
+            errors.append(error)
+    waited = time.perf_counter() - start
+    with io_stats_lock:
+        for artifact, stats in sorted(io_stats.items()):
+            log(f"Image writes ({artifact}): {stats['files']} files, {stats['bytes'] / 2 ** 20:.1f} MiB, "
+                f"{stats['seconds']:.2f}s encoding")
+        if io_stats:
+            log(f"Waited {waited:.2f}s for image writes to finish")
+        io_stats.clear()
+    if errors:
+        raise errors[0]
+
+def read_images(paths, flags):
+    # decode a few files ahead on the I/O threads, so only those are held in memory at once
+    pending = collections.deque()
+    for path in paths:
+        pending.append(io_executor().submit(cv2.imread, path, flags))
+        if len(pending) > IO_THREADS:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+# ------------------ COVERAGE INDEX ------------------
+
+def build_coverage_index(image, tile_size):
+    # one flag per tile: does the baked map have any non-black pixel there
+    height, width = image.shape[:2]
+    rows = -(-height // tile_size)
+    cols = -(-width // tile_size)
+    index = np.zeros((rows, cols), dtype=bool)
+    occupied = np.zeros(cols * tile_size, dtype=bool)
+    for row in range(rows):
+        band = image[row * tile_size:(row + 1) * tile_size, :, :3]
+        occupied[:width] = np.any(band != 0, axis=(0, 2))
+        index[row] = occupied.reshape(cols, tile_size).any(axis=1)
+    return index
+
+def dilate_coverage_index(index):
+    # grow by one tile so paint that bleeds past an island edge is kept
+    dilated = index.copy()
+    dilated[1:] |= index[:-1]
+    dilated[:-1] |= index[1:]
+    grown = dilated.copy()
+    grown[:, 1:] |= dilated[:, :-1]
+    grown[:, :-1] |= dilated[:, 1:]
+    return grown
+
+def iter_blocks(shape, coverage, tile_size, strip_rows, occupied=True):
+    # without an index, whole strips; with one, runs of tiles in each tile row that match `occupied`
+    height, width = shape[:2]
+    if coverage is None:
+        if occupied:
+            for rows in iter_strips(height, strip_rows):
+                yield rows, slice(None)
+        return
+
+    for row, flags in enumerate(coverage):
+        rows = slice(row * tile_size, min((row + 1) * tile_size, height))
+        col = 0
+        while col < len(flags):
+            if flags[col] != occupied:
+                col += 1
+                continue
+            start = col
+            while col < len(flags) and flags[col] == occupied:
+                col += 1
+            yield rows, slice(start * tile_size, min(col * tile_size, width))
+
+def set_render_border(coverage, tile_size, resolution):
+    # render only the bounding box of the occupied tiles; outside it the render stays transparent black.
+    # the edges come from the tiles' pixel bounds, so a last tile cut short by the frame still fits
+    render = bpy.context.scene.render
+    if coverage is None or coverage.all() or not coverage.any():
+        render.use_border = False
+        return
+    rows = np.flatnonzero(coverage.any(axis=1))
+    cols = np.flatnonzero(coverage.any(axis=0))
+    render.use_border = True
+    render.use_crop_to_border = False
+    render.border_min_x = cols[0] * tile_size / resolution
+    render.border_max_x = min((cols[-1] + 1) * tile_size, resolution) / resolution
+    # Blender measures the border from the bottom of the frame
+    render.border_min_y = 1 - min((rows[-1] + 1) * tile_size, resolution) / resolution
+    render.border_max_y = 1 - rows[0] * tile_size / resolution
+
+def apply_black_mask(original_image, modified_image):
+    mask = np.all(original_image == [0, 0, 0], axis=-1)
+    modified_image[mask] = [0, 0, 0]
+
+def strip_black_to_alpha(image):
+    # check if image has an alpha channel
+    if image.shape[2] == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_RGB2RGBA)
+
+    # set black pixels to transparent
+    image[np.all(image[:, :, :3] == [0, 0, 0], axis=-1)] = [0, 0, 0, 0]
+    return image
+
+# ------------------ COLOR ADJUSTMENT ------------------
+
+# each adjustment edits one channel of an OpenCV HSV image (hue 0-179, saturation and value 0-255) in place
+def hue_shift(hsv_image, amount):
+    hsv_image[:, :, 0] = (hsv_image[:, :, 0].astype(int) + amount) % 180
+
+def saturation_offset(hsv_image, amount):
+    hsv_image[:, :, 1] = np.clip(hsv_image[:, :, 1].astype(int) + amount, 0, 255)
+
+def saturation_gain(hsv_image, amount):
+    hsv_image[:, :, 1] = np.clip(hsv_image[:, :, 1] * amount, 0, 255)
+
+def value_offset(hsv_image, amount):
+    hsv_image[:, :, 2] = np.clip(hsv_image[:, :, 2].astype(int) + amount, 0, 255)
+
+def value_gain(hsv_image, amount):
+    hsv_image[:, :, 2] = np.clip(hsv_image[:, :, 2] * amount, 0, 255)
+
+COLOR_ADJUSTMENTS = {
+    'hue_shift': hue_shift,
+    'saturation_offset': saturation_offset,
+    'saturation_gain': saturation_gain,
+    'value_offset': value_offset,
+    'value_gain': value_gain,
+}
+
+# chains of (adjustment, amount) applied in order; an asset can also point color_preset at a .json file of the same shape
+COLOR_PRESETS = {
+    'default': [('hue_shift', -2), ('value_gain', 1.05)],
+    'muted': [('hue_shift', -2), ('saturation_offset', -10), ('value_gain', 1.05)],
+    'none': [],
+}
+LUT_CACHE_DIRNAME = 'lut_cache'
+
+def resolve_color_preset(preset, base_dir):
+    if preset.endswith('.json'):
+        with open(os.path.join(base_dir, preset)) as f:
+            chain = json.load(f)
+    elif preset in COLOR_PRESETS:
+        chain = COLOR_PRESETS[preset]
+    else:
+        raise ValueError(f"Unknown color preset: {preset}")
+    for name, amount in chain:
+        if name not in COLOR_ADJUSTMENTS:
+            raise ValueError(f"Unknown color adjustment in preset {preset}: {name}")
+    return [(name, amount) for name, amount in chain]
+
+def adjust_colors(color_channels, chain):
+    # reference path: the whole chain on real pixels, also used to compile the lookup table
+    hsv_image = cv2.cvtColor(color_channels, cv2.COLOR_RGB2HSV)
+    for name, amount in chain:
+        COLOR_ADJUSTMENTS[name](hsv_image, amount)
+    return cv2.cvtColor(hsv_image, cv2.COLOR_HSV2RGB)
+
+def compile_color_lut(chain):
+    # run the chain once over every 24-bit color, 1024 x 1024 colors at a time; entry c0 | c1 << 8 | c2 << 16
+    # holds the adjusted color packed the same way, so a BGRA pixel read as a little-endian word indexes it directly
+    lut = np.empty(1 << 24, dtype=np.uint32)
+    chunk = 1 << 20
+    for start in range(0, 1 << 24, chunk):
+        index = np.arange(start, start + chunk, dtype=np.uint32)
+        colors = np.stack([index & 255, (index >> 8) & 255, index >> 16], axis=-1).astype(np.uint8)
+        adjusted = adjust_colors(colors.reshape(1024, 1024, 3), chain).reshape(-1, 3).astype(np.uint32)
+        lut[start:start + chunk] = adjusted[:, 0] | adjusted[:, 1] << 8 | adjusted[:, 2] << 16
+    return lut
+
+# compiled tables kept for the life of the process, keyed by chain hash
+color_luts = {}
+
+def load_color_lut(chain, cache_dir):
+    key = hashlib.sha1(json.dumps(chain).encode()).hexdigest()[:16]
+    if key in color_luts:
+        return color_luts[key]
+
+    lut_path = os.path.join(cache_dir, f'color_lut_{key}.npy')
+    if os.path.exists(lut_path):
+        lut = np.load(lut_path)
+    else:
+        with span('compile_color_lut', adjustments=len(chain)):
+            lut = compile_color_lut(chain)
+        os.makedirs(cache_dir, exist_ok=True)
+        partial_path = f"{lut_path}.{os.getpid()}.npy"
+        np.save(partial_path, lut)
+        os.replace(partial_path, lut_path)
+        log(f"Compiled color LUT {key} for {chain}")
+    color_luts[key] = lut
+    return lut
+
+def apply_color_lut(lut, pixels, out):
+    # one gather per pixel whatever the length of the chain; alpha is carried over in place
+    if pixels.shape[2] == 4 and sys.byteorder == 'little':
+        words = pixels.view(np.uint32)[..., 0]
+        out_words = out.view(np.uint32)[..., 0]
+        out_words[:] = np.take(lut, words & 0xFFFFFF)
+        out_words |= words & 0xFF000000
+        return
+    index = pixels[..., 0].astype(np.uint32)
+    index |= pixels[..., 1].astype(np.uint32) << 8
+    index |= pixels[..., 2].astype(np.uint32) << 16
+    adjusted = np.take(lut, index)
+    for channel in range(3):
+        out[..., channel] = adjusted >> (8 * channel)
+    if pixels.shape[2] == 4:
+        out[..., 3] = pixels[..., 3]
+
+def apply_thread_budget(threads):
+    # 0 keeps Blender's and OpenCV's automatic thread counts
+    if threads <= 0:
+        return
+    bpy.context.scene.render.threads_mode = 'FIXED'
+    bpy.context.scene.render.threads = threads
+    cv2.setNumThreads(threads)
+    log(f"Thread budget set to {threads}.")
+
+# mtime and size of the open template when it was loaded, so a re-saved template is noticed
+open_template_stat = {}
+
+def template_stat(blender_file_path):
+    stat = os.stat(blender_file_path)
+    return os.path.abspath(blender_file_path), stat.st_mtime_ns, stat.st_size
+
+def open_template(blender_file_path):
+    # every job resets the image, render settings and output path it uses,
+    # so a template that is already open can be painted again without reloading it,
+    # unless it was saved again since; the stage cache keys renders by the file on disk
+    stat = template_stat(blender_file_path)
+    if os.path.abspath(bpy.data.filepath) == stat[0] and open_template_stat.get('stat') == stat:
+        log(f"Template already open: {blender_file_path}")
+        return
+    with span('template_load', template=os.path.basename(blender_file_path)):
+        bpy.ops.wm.open_mainfile(filepath=blender_file_path)
+    open_template_stat['stat'] = stat
+
+def baked_map_path(work_dir, name):
+    raw_path = os.path.join(work_dir, f'{name}.npy')
+    return raw_path if os.path.exists(raw_path) else os.path.join(work_dir, f'{name}.png')
+
+def load_baked_map(work_dir, name, scratch_dir, resolution=None):
+    # raw .npy bakes from the add-on are mapped straight from disk, PNG bakes are decoded once
+    path = baked_map_path(work_dir, name)
+    if path.endswith('.npy'):
+        image = np.load(path, mmap_mode='c')
+    else:
+        image = load_image_memmap(path, cv2.IMREAD_UNCHANGED, scratch_dir, name)
+    if resolution is None or image.shape[0] == resolution:
+        return image
 
-    final_path = os.path.join(current_blend_dir, f'final_{seed}.png')
+    # previews reuse the full size bake; nearest keeps the black background exactly black
+    log(f"Resizing {name} bake from {image.shape[0]} to {resolution}")
+    resized = create_memmap(scratch_dir, f'{name}_{resolution}', (resolution, resolution) + image.shape[2:], image.dtype)
+    resized[:] = cv2.resize(np.asarray(image), (resolution, resolution), interpolation=cv2.INTER_NEAREST).reshape(resized.shape)
+    return resized
 
-    # [0] open Blender file
-    bpy.ops.wm.open_mainfile(filepath=blender_file_path)
+def apply_sampling(samples, noise_threshold, min_samples):
+    # with a noise threshold, samples is only the cap and Cycles stops each pixel once it is clean enough;
+    # without one the template's (or its Cycles profile's) sampling settings stand
+    cycles = bpy.context.scene.cycles
+    cycles.samples = samples
+    if noise_threshold is None:
+        return
+    cycles.use_adaptive_sampling = True
+    cycles.adaptive_threshold = noise_threshold
+    cycles.adaptive_min_samples = min_samples
+    log(f"Adaptive sampling: noise threshold {noise_threshold}, up to {samples} samples")
 
-    # [1] replace packed image data with generated normal map
-    packed_image_name = 'normals.png'
-    image_found = False
+def set_template_image(packed_image_name, image_bgr, scratch_dir):
+    # hand the pixels over as an uncompressed TIFF that Blender loads into a byte buffer, then pack it,
+    # so tile workers get it with the scene; setting Image.pixels would need a float32 RGBA copy, 16 bytes per pixel
     for image in bpy.data.images:
         if image.name == packed_image_name:
             log(f"Found packed image: {image.name}")
-            image.filepath = image_path
-            log(f"Setting image filepath to: {image.filepath}")
-            image.source = 'FILE'
+            path = os.path.join(scratch_dir, f'template_{os.path.splitext(packed_image_name)[0]}.tif')
+            if not cv2.imwrite(path, image_bgr, image_write_params(path, None)):
+                raise IOError(f"Could not write {path}")
+            if image.packed_file is not None:
+                image.unpack(method='REMOVE')
+            image.filepath = path
             image.reload()
             image.pack()
-            image_found = True
-            log("Image replaced and repacked successfully.")
-            break
+            os.remove(path)
+            log("Image pixels replaced successfully.")
+            return True
 
-    if not image_found:
-        log(f"Image named '{packed_image_name}' not found in the blend file.")
-        return
+    log(f"Image named '{packed_image_name}' not found in the blend file.")
+    return False
 
-    # [2] set resolution and sample count and output path
-    bpy.context.scene.render.resolution_x = resolution_arg
-    bpy.context.scene.render.resolution_y = resolution_arg
-    bpy.context.scene.render.resolution_percentage = 100
-    bpy.context.scene.cycles.samples = samples_arg
+def set_render_output(output_base, debug_intermediates, options=None):
+    # uncompressed TIFF carries the render to post-processing without a zlib round trip
+    image_settings = bpy.context.scene.render.image_settings
+    if debug_intermediates and options['intermediate_format'] == 'png':
+        image_settings.file_format = 'PNG'
+        if options['intermediate_compression'] is not None:
+            # Blender's compression is a percentage of zlib's 9 levels
+            image_settings.compression = round(options['intermediate_compression'] * 100 / 9)
+        output_path = output_base + '.png'
+    else:
+        image_settings.file_format = 'TIFF'
+        image_settings.tiff_codec = 'NONE'
+        output_path = output_base + '.tif'
     bpy.context.scene.render.filepath = output_path
-    bpy.context.scene.render.image_settings.file_format = 'PNG'
+    return output_path
+
+def load_render_output(output_path, flags, scratch_dir, name, debug_intermediates):
+    image = load_image_memmap(output_path, flags, scratch_dir, name)
+    if not debug_intermediates:
+        os.remove(output_path)
+    return image
+
+# ------------------ CYCLES PROFILE ------------------
+
+CYCLES_PROFILE_DIRNAME = 'cycles_profiles'
+# the settings a profile may change; everything else stays as saved in the template.
+# not every Blender has all of them (tile_size is 3.0+), missing ones are skipped
+TUNED_CYCLES_SETTINGS = ('max_bounces', 'use_denoising', 'tile_size', 'use_adaptive_sampling', 'adaptive_threshold', 'adaptive_min_samples')
+# candidates per knob, tried one knob at a time on top of the best settings found so far
+CYCLES_TUNING_KNOBS = [
+    ('max_bounces', [{'max_bounces': bounces} for bounces in (8, 4, 2)]),
+    ('adaptive_sampling', [{'use_adaptive_sampling': False}] +
+                          [{'use_adaptive_sampling': True, 'adaptive_threshold': threshold} for threshold in (0.01, 0.05, 0.1)]),
+    ('denoising', [{'use_denoising': False}, {'use_denoising': True}]),
+    # tiles per frame side rather than pixels, so a tile count found on the small tuning frame
+    # carries over to the paint resolution
+    ('tile_size', [{'tile_divisions': divisions} for divisions in (1, 4, 16)]),
+]
+# profile settings stored relative to the frame, and the Cycles setting each one becomes
+RELATIVE_CYCLES_SETTINGS = {'tile_divisions': 'tile_size'}
+TUNE_RESOLUTION = 512
+TUNE_SAMPLES = 100
+# largest RMSE, in 8-bit levels, a candidate may differ from the reference render by
+TUNE_TOLERANCE = 2.0
+# a candidate must beat the best time so far by this much, so timing noise does not pick settings
+TUNE_MIN_SPEEDUP = 0.03
 
-    # [3] render painted normals
-    log("Rendering painted normals...")
+# tuned settings of each template as saved, and loaded profiles keyed by path and mtime
+template_cycles_settings = {}
+cycles_profiles = {}
+
+def cycles_profile_path():
+    return os.path.join(os.path.dirname(bpy.data.filepath), CYCLES_PROFILE_DIRNAME, f'{socket.gethostname()}.json')
+
+def load_cycles_profile(profile):
+    # 'auto' is this host's tuned profile if there is one, 'none' keeps the templates as saved, anything else is a path
+    if profile == 'none':
+        return {}
+    path = cycles_profile_path() if profile == 'auto' else profile
+    if not os.path.exists(path):
+        if profile != 'auto':
+            raise FileNotFoundError(f"Cycles profile not found: {path}")
+        return {}
+    key = (path, os.path.getmtime(path))
+    if key not in cycles_profiles:
+        with open(path) as f:
+            cycles_profiles[key] = json.load(f)
+    return cycles_profiles[key]
+
+def apply_cycles_settings(settings, resolution):
+    # start from the template's saved values so settings from an earlier job never leak into this one
+    cycles = bpy.context.scene.cycles
+    settings = dict(settings)
+    if 'tile_divisions' in settings:
+        settings['tile_size'] = -(-resolution // settings.pop('tile_divisions'))
+    saved = template_cycles_settings.setdefault(
+        bpy.data.filepath, {name: getattr(cycles, name) for name in TUNED_CYCLES_SETTINGS if hasattr(cycles, name)})
+    for name, value in dict(saved, **settings).items():
+        if not hasattr(cycles, name):
+            log(f"Cycles setting {name} is not available in Blender {bpy.app.version_string}, skipping it")
+            continue
+        setattr(cycles, name, value)
+
+def apply_cycles_profile(profile, resolution):
+    template = os.path.basename(bpy.data.filepath)
+    settings = load_cycles_profile(profile).get('templates', {}).get(template, {}).get('settings', {})
+    apply_cycles_settings(settings, resolution)
+    if settings:
+        log(f"Cycles profile for {template}: {settings}")
+
+def render_tune_frame(scratch_dir, name):
+    output_path = set_render_output(os.path.join(scratch_dir, name), False)
+    start = time.perf_counter()
     bpy.ops.render.render(write_still=True)
-    log("Painted normal map generated!")
+    seconds = time.perf_counter() - start
+    image = cv2.imread(output_path, cv2.IMREAD_UNCHANGED).astype(np.float32)
+    os.remove(output_path)
+    return seconds, image
 
-    # [4] create mask of original normal map
-    original_image = cv2.imread(image_path)
-    mask = np.all(original_image == [0, 0, 0], axis=-1)
-    log("Mask created.")
+def autotune_template(template_path, resolution, samples, tolerance, scratch_dir):
+    open_template(template_path)
+    render = bpy.context.scene.render
+    render.resolution_x = resolution
+    render.resolution_y = resolution
+    render.resolution_percentage = 100
+    render.use_border = False
+    bpy.context.scene.cycles.samples = samples
+    apply_cycles_settings({}, resolution)
 
-    # [5] apply mask to rendered image
-    modified_image = cv2.imread(output_path)
-    modified_image[mask] = [0, 0, 0]
-    cv2.imwrite(mask_path, modified_image)
-    log("Clipping mask applied successfully.")
+    # [0] warm up, then time the template as saved as the reference for speed and quality
+    render_tune_frame(scratch_dir, 'warmup')
+    reference_seconds, reference = render_tune_frame(scratch_dir, 'reference')
+    log(f"{os.path.basename(template_path)} reference: {reference_seconds:.2f}s")
+
+    # [1] keep the fastest candidate of each knob that stays within the tolerance
+    best, best_seconds, best_error = {}, reference_seconds, 0.0
+    for knob, candidates in CYCLES_TUNING_KNOBS:
+        if not all(hasattr(bpy.context.scene.cycles, RELATIVE_CYCLES_SETTINGS.get(name, name))
+                   for candidate in candidates for name in candidate):
+            log(f"  {knob}: not available in Blender {bpy.app.version_string}, skipping")
+            continue
+        chosen = None
+        for candidate in candidates:
+            settings = dict(best, **candidate)
+            apply_cycles_settings(settings, resolution)
+            with span('autotune_candidate', knob=knob, settings=settings):
+                seconds, image = render_tune_frame(scratch_dir, 'candidate')
+            error = float(np.sqrt(np.mean((image - reference) ** 2)))
+            log(f"  {settings}: {seconds:.2f}s, rmse {error:.2f}")
+            if error <= tolerance and seconds < best_seconds * (1 - TUNE_MIN_SPEEDUP):
+                chosen, best_seconds, best_error = candidate, seconds, error
+        if chosen is not None:
+            best = dict(best, **chosen)
+
+    apply_cycles_settings({}, resolution)
+    return {'settings': best, 'seconds': best_seconds, 'reference_seconds': reference_seconds, 'rmse': best_error}
+
+def run_autotune(args):
+    # blender -b painter.blend -P auto_painter.py -- autotune [render_resolution N] [samples N] [tolerance RMSE] [threads N]
+    resolution = int(get_optional_arg(args, 'render_resolution', TUNE_RESOLUTION))
+    samples = int(get_optional_arg(args, 'samples', TUNE_SAMPLES))
+    tolerance = float(get_optional_arg(args, 'tolerance', TUNE_TOLERANCE))
+    apply_thread_budget(int(get_optional_arg(args, 'threads', 0)))
+    current_blend_dir = os.path.dirname(bpy.data.filepath)
+
+    profile = {
+        'host': socket.gethostname(),
+        'cpu_count': os.cpu_count(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'resolution': resolution,
+        'samples': samples,
+        'tolerance': tolerance,
+        'templates': {},
+    }
+    scratch_dir = tempfile.mkdtemp(prefix='auto_painter_tune_')
+    try:
+        for template in JOB_TEMPLATES.values():
+            with span('autotune', template=template):
+                profile['templates'][template] = autotune_template(
+                    os.path.join(current_blend_dir, template), resolution, samples, tolerance, scratch_dir)
+    finally:
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+
+    profile_path = cycles_profile_path()
+    os.makedirs(os.path.dirname(profile_path), exist_ok=True)
+    with open(profile_path + '.tmp', 'w') as f:
+        json.dump(profile, f, indent=2)
+    os.replace(profile_path + '.tmp', profile_path)
+    for template, result in profile['templates'].items():
+        log(f"{template}: {result['reference_seconds']:.2f}s -> {result['seconds']:.2f}s "
+            f"(rmse {result['rmse']:.2f}) with {result['settings']}")
+    log(f"Cycles profile written to {profile_path}")
+
+# ------------------ STAGE CACHE ------------------
+
+# per map and output suffix, the fingerprint each stage last ran with and the render it produced;
+# the seed is only part of the fingerprint, so a new seed replaces the kept render instead of adding one
+STAGE_CACHE_DIRNAME = 'stage_cache'
+
+# file digests keyed by path, mtime and size, so an unchanged bake is only hashed once per process
+file_fingerprints = {}
+
+def fingerprint(*parts):
+    return hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+def file_fingerprint(path):
+    # by content: the add-on rewrites the bake on every run, even when it comes from the bake cache
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    if key not in file_fingerprints:
+        digest = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        file_fingerprints[key] = digest.hexdigest()
+    return file_fingerprints[key]
+
+def render_fingerprint(template_path, bake_path, resolution, samples, seed, options):
+    # everything the render reads: the bake, the template as saved, its Cycles profile and the render settings
+    template = os.path.basename(template_path)
+    stat = os.stat(template_path)
+    profile = load_cycles_profile(options['cycles_profile']).get('templates', {}).get(template, {}).get('settings', {})
+    return fingerprint('render', file_fingerprint(bake_path), template, stat.st_mtime_ns, stat.st_size, profile,
+                       resolution, samples, seed, options['noise_threshold'], options['min_samples'], options['coverage_tile'])
+
+def stage_cache_path(work_dir, slot, extension):
+    return os.path.join(work_dir, STAGE_CACHE_DIRNAME, f'{slot}.{extension}')
+
+def load_stage_record(work_dir, slot):
+    path = stage_cache_path(work_dir, slot, 'json')
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def save_stage_record(work_dir, slot, record):
+    path = stage_cache_path(work_dir, slot, 'json')
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    with open(temp_path, 'w') as f:
+        json.dump(record, f, indent=2)
+    os.replace(temp_path, path)
 
-    # [6] apply color correction with desired percentage
-    result_image = correct_colors_advanced(original_image, modified_image)
-    cv2.imwrite(final_path, result_image)
-    log("Color correction applied!")
+def load_cached_render(work_dir, slot, record, render_key):
+    # the kept render of this slot, if it was made from exactly these inputs
+    path = stage_cache_path(work_dir, slot, 'npy')
+    if record.get('render') != render_key or not os.path.exists(path):
+        return None
+    log(f"Render inputs unchanged, reusing {path}")
+    # copy on write, so masking in place never touches the kept render
+    return np.load(path, mmap_mode='c')
 
-def paint_color_map(resolution_arg, samples_arg, seed):
+def cache_render(work_dir, slot, record, render_key, image):
+    # drop the stale record first, so a crash mid-write never pairs the new key with an old render
+    record.clear()
+    save_stage_record(work_dir, slot, record)
+    path = stage_cache_path(work_dir, slot, 'npy')
+    temp_path = f'{path}.{os.getpid()}.tmp.npy'
+    with span('cache_render', slot=slot):
+        np.save(temp_path, image)
+    os.replace(temp_path, path)
+    record['render'] = render_key
+    save_stage_record(work_dir, slot, record)
+
+# ------------------ TILE RENDERING ------------------
+
+def tile_regions(resolution, render_tiles, coverage, tile_size):
+    # pixel rectangles (top, bottom, left, right) of an n x n grid, skipping tiles with nothing painted
+    edges = [resolution * i // render_tiles for i in range(render_tiles + 1)]
+    regions = []
+    for row in range(render_tiles):
+        for col in range(render_tiles):
+            top, bottom, left, right = edges[row], edges[row + 1], edges[col], edges[col + 1]
+            if coverage is not None:
+                # every coverage tile that overlaps the region, however the two grids line up
+                occupied = coverage[top // tile_size:-(-bottom // tile_size),
+                                    left // tile_size:-(-right // tile_size)]
+                if not occupied.any():
+                    continue
+            regions.append((top, bottom, left, right))
+    return regions
+
+def render_tile(queue_dir, job):
+    render = bpy.context.scene.render
+    resolution = job['resolution']
+    render.use_border = True
+    render.use_crop_to_border = True
+    # half-pixel offsets so Blender's truncation lands on the exact pixel edges; y counts from the bottom
+    render.border_min_x = (job['left'] + 0.5) / resolution
+    render.border_max_x = min(1.0, (job['right'] + 0.5) / resolution)
+    render.border_min_y = (resolution - job['bottom'] + 0.5) / resolution
+    render.border_max_y = min(1.0, (resolution - job['top'] + 0.5) / resolution)
+
+    name = f"tile_{job['index']:04d}"
+    partial_path = set_render_output(os.path.join(queue_dir, 'claimed', name), False)
+    with span('render_tile', tile=job['index']):
+        bpy.ops.render.render(write_still=True)
+    os.replace(partial_path, os.path.join(queue_dir, 'done', name + '.tif'))
+
+def claim_tile_job(queue_dir):
+    # renaming out of pending is atomic, so each tile goes to exactly one worker
+    pending_dir = os.path.join(queue_dir, 'pending')
+    for name in sorted(os.listdir(pending_dir)):
+        claimed_path = os.path.join(queue_dir, 'claimed', name)
+        try:
+            os.rename(os.path.join(pending_dir, name), claimed_path)
+        except OSError:
+            continue
+        with open(claimed_path) as f:
+            return json.load(f)
+    return None
+
+def run_tile_worker(queue_dir, threads):
+    apply_thread_budget(threads)
+    rendered = 0
+    while True:
+        job = claim_tile_job(queue_dir)
+        if job is None:
+            break
+        render_tile(queue_dir, job)
+        rendered += 1
+    log(f"Tile worker rendered {rendered} tiles.")
+
+def render_distributed(output_path, flags, scratch_dir, name, coverage, options, debug_intermediates):
+    resolution = bpy.context.scene.render.resolution_x
+    regions = tile_regions(resolution, options['render_tiles'], coverage, options['coverage_tile'])
+    queue_root = options['tile_queue'] or options['work_dir'] or os.path.dirname(bpy.data.filepath)
+    os.makedirs(queue_root, exist_ok=True)
+    queue_dir = tempfile.mkdtemp(prefix='tiles_', dir=queue_root)
+    try:
+        for folder in ('pending', 'claimed', 'done'):
+            os.makedirs(os.path.join(queue_dir, folder))
+
+        # [0] workers render from a copy of the scene as it is now, with the edited template image packed
+        for image in bpy.data.images:
+            if image.is_dirty:
+                image.pack()
+        blend_path = os.path.join(queue_dir, 'scene.blend')
+        bpy.ops.wm.save_as_mainfile(filepath=blend_path, copy=True)
+
+        # [1] queue one job file per tile
+        jobs = []
+        for index, (top, bottom, left, right) in enumerate(regions):
+            job = {'index': index, 'resolution': resolution, 'top': top, 'bottom': bottom, 'left': left, 'right': right}
+            jobs.append(job)
+            with open(os.path.join(queue_dir, 'pending', f'tile_{index:04d}.json'), 'w') as f:
+                json.dump(job, f)
+
+        # [2] drain the queue with a local pool; other machines sharing the directory can join in
+        workers = options['render_workers'] or (os.cpu_count() or 1)
+        workers = min(workers, len(jobs))
+        threads = options['threads'] or max(1, (os.cpu_count() or 1) // max(workers, 1))
+        log(f"Rendering {len(jobs)} of {options['render_tiles'] ** 2} tiles on {workers} local workers with {threads} threads each. "
+            f"Other machines can join with: blender -b {blend_path} -P {os.path.abspath(__file__)} -- tile_worker {queue_dir}")
+        start = time.perf_counter()
+        processes = {index: spawn_painter(blend_path, ['tile_worker', queue_dir, 'threads', str(threads)]) for index in range(workers)}
+        durations, failed = wait_for_painters(processes, start)
+        if failed:
+            log(f"Tile workers failed: {', '.join(str(index) for index in failed)}")
+
+        # [3] anything a failed worker left behind is rendered here
+        for job in jobs:
+            if not os.path.exists(os.path.join(queue_dir, 'done', f"tile_{job['index']:04d}.tif")):
+                log(f"Rendering leftover tile {job['index']} locally...")
+                render_tile(queue_dir, job)
+
+        # [4] stitch in tile order; tiles never overlap, so the frame is the same for every run of a seed
+        with span('stitch_tiles', tiles=len(jobs)):
+            image = None
+            tile_paths = [os.path.join(queue_dir, 'done', f"tile_{job['index']:04d}.tif") for job in jobs]
+            for job, tile in zip(jobs, read_images(tile_paths, flags)):
+                if image is None:
+                    image = create_memmap(scratch_dir, name, (resolution, resolution) + tile.shape[2:], tile.dtype)
+                image[job['top']:job['bottom'], job['left']:job['right']] = tile
+            if image is None:
+                channels = 3 if flags == cv2.IMREAD_COLOR else 4
+                image = create_memmap(scratch_dir, name, (resolution, resolution, channels), np.uint8)
+            if debug_intermediates:
+                # the mask stage changes the frame in place, so the debug copy gets its own buffer
+                write_image(output_path, np.array(image), 'intermediate', options)
+    finally:
+        shutil.rmtree(queue_dir, ignore_errors=True)
+    return image
+
+def paint_normal_map(resolution_arg, samples_arg, seed, options=None):
+    log("Starting NORMAL MAP painting...")
+    if options is None:
+        options = read_paint_options(lambda name: None)
+    current_blend_dir = os.path.dirname(bpy.data.filepath)
+    work_dir = options['work_dir'] or current_blend_dir
+    blender_file_path = os.path.join(current_blend_dir, 'painter.blend')
+    output_base = os.path.join(work_dir, 'painted')
+    mask_path = intermediate_path(os.path.join(work_dir, 'masked'), options)
+    strip_rows = options['strip_rows']
+    tile_size = options['coverage_tile']
+    debug_intermediates = options['debug_intermediates']
+    thresholds = (options['hue_threshold'], options['sat_threshold'], options['val_threshold'])
+
+    final_path = os.path.join(work_dir, f"final_{seed}{options['output_suffix']}.png")
+
+    # [0] fingerprint the render and post-processing inputs; debug runs always write every intermediate
+    incremental = options['incremental'] and not debug_intermediates
+    slot = f"normal{options['output_suffix']}"
+    record = {}
+    if incremental:
+        record = load_stage_record(work_dir, slot)
+        render_key = render_fingerprint(blender_file_path, baked_map_path(work_dir, 'normals'), resolution_arg, samples_arg, seed, options)
+        final_key = fingerprint('final', render_key, options['correction_engine'], options['max_angle'], thresholds, tile_size)
+        if record.get('final') == final_key and os.path.exists(final_path):
+            log(f"Normal map inputs unchanged, keeping {final_path}")
+            return final_path
+    check_memory_budget(resolution_arg, options)
+
+    scratch_dir = tempfile.mkdtemp(prefix='auto_painter_')
+    try:
+        original_image = load_baked_map(work_dir, 'normals', scratch_dir, resolution_arg)[..., :3]
+
+        # [1] index which tiles of the bake are painted at all
+        coverage = None
+        if tile_size > 0:
+            with span('coverage_index', map='normal'):
+                coverage = build_coverage_index(original_image, tile_size)
+            log(f"Normal map coverage: {coverage.mean() * 100:.1f}% of {tile_size}px tiles")
+
+        # [2] only post-processing changed: start from the kept render
+        modified_image = load_cached_render(work_dir, slot, record, render_key) if incremental else None
+        if modified_image is None:
+            # [3] open Blender file, apply this host's Cycles profile and replace the packed image data with the bake
+            open_template(blender_file_path)
+            apply_cycles_profile(options['cycles_profile'], resolution_arg)
+            with span('set_template_image', map='normal'):
+                if not set_template_image('normals.png', original_image, scratch_dir):
+                    return
+
+            # [4] set resolution and sample count and output path
+            apply_thread_budget(options['threads'])
+            bpy.context.scene.render.resolution_x = resolution_arg
+            bpy.context.scene.render.resolution_y = resolution_arg
+            bpy.context.scene.render.resolution_percentage = 100
+            apply_sampling(samples_arg, options['noise_threshold'], options['min_samples'])
+            set_render_border(coverage, tile_size, resolution_arg)
+            output_path = set_render_output(output_base, debug_intermediates, options)
+
+            # [5] render painted normals, split over tile workers if asked
+            log("Rendering painted normals...")
+            with span('render', map='normal', resolution=resolution_arg, samples=samples_arg, tiles=options['render_tiles']):
+                if options['render_tiles'] > 1:
+                    modified_image = render_distributed(output_path, cv2.IMREAD_COLOR, scratch_dir, 'modified', coverage, options, debug_intermediates)
+                else:
+                    bpy.ops.render.render(write_still=True)
+            log("Painted normal map generated!")
+            if options['render_tiles'] <= 1:
+                with span('load_render', map='normal'):
+                    modified_image = load_render_output(output_path, cv2.IMREAD_COLOR, scratch_dir, 'modified', debug_intermediates)
+            if incremental:
+                cache_render(work_dir, slot, record, render_key, modified_image)
+
+        # [6] create mask of original normal map and apply it to the rendered image, tile run by tile run
+        with span('mask', map='normal'):
+            for block in iter_blocks(original_image.shape, coverage, tile_size, strip_rows):
+                apply_black_mask(original_image[block], modified_image[block])
+            if debug_intermediates:
+                # empty tiles are black in the bake, so the mask clears them completely
+                for block in iter_blocks(original_image.shape, coverage, tile_size, strip_rows, occupied=False):
+                    modified_image[block] = 0
+                write_image(mask_path, modified_image, 'intermediate', options)
+        log("Clipping mask applied successfully.")
+
+        # [7] apply color correction with desired percentage; empty tiles stay black
+        with span('color_correction', map='normal', engine=options['correction_engine']):
+            result_image = create_memmap(scratch_dir, 'result', original_image.shape, np.uint8)
+            for block in iter_blocks(original_image.shape, coverage, tile_size, strip_rows):
+                result_image[block] = correct_colors_advanced(original_image[block], modified_image[block],
+                                                              options['correction_engine'], options['max_angle'], thresholds)
+        # [8] the final is recorded as done only once it is on disk
+        on_written = None
+        if incremental:
+            record['final'] = final_key
+            on_written = lambda: save_stage_record(work_dir, slot, record)
+        with span('final_write', map='normal'):
+            write_image(final_path, result_image, 'final', options, on_written)
+        log("Color correction applied!")
+        del original_image, modified_image, result_image
+    finally:
+        remove_after_writes(scratch_dir)
+
+    return final_path
+
+def paint_color_map(resolution_arg, samples_arg, seed, options=None):
     log("Starting COLOR MAP painting...")
+    if options is None:
+        options = read_paint_options(lambda name: None)
     current_blend_dir = os.path.dirname(bpy.data.filepath)
+    work_dir = options['work_dir'] or current_blend_dir
     blender_file_path = os.path.join(current_blend_dir, 'color_painter.blend')
-    image_path = os.path.join(current_blend_dir, 'colors.png')
-    pre_path = os.path.join(current_blend_dir, f'pre_colors_{seed}.png')
+    output_base = os.path.join(work_dir, f'pre_colors_{seed}')
+    strip_rows = options['strip_rows']
+    tile_size = options['coverage_tile']
+    debug_intermediates = options['debug_intermediates']
+    color_chain = resolve_color_preset(options['color_preset'], current_blend_dir)
+    adjusted_image_path = os.path.join(work_dir, f"final_colors_{seed}{options['output_suffix']}.png")
 
-    # [0] convert black pixels to transparent
-    image = cv2.imread(image_path, cv2.IMREAD_UNCHANGED)
+    # [0] fingerprint the render and the adjustment chain; debug runs always write every intermediate
+    incremental = options['incremental'] and not debug_intermediates
+    slot = f"color{options['output_suffix']}"
+    record = {}
+    if incremental:
+        record = load_stage_record(work_dir, slot)
+        render_key = render_fingerprint(blender_file_path, baked_map_path(work_dir, 'colors'), resolution_arg, samples_arg, seed, options)
+        final_key = fingerprint('final', render_key, color_chain, tile_size)
+        if record.get('final') == final_key and os.path.exists(adjusted_image_path):
+            log(f"Color map inputs unchanged, keeping {adjusted_image_path}")
+            return adjusted_image_path
+    check_memory_budget(resolution_arg, options)
 
-    # [1] check if image has an alpha channel
-    if image.shape[2] == 3:
-        image = cv2.cvtColor(image, cv2.COLOR_RGB2RGBA)
+    scratch_dir = tempfile.mkdtemp(prefix='auto_painter_')
+    try:
+        image = load_baked_map(work_dir, 'colors', scratch_dir, resolution_arg)
 
-    # [2] set black pixels to transparent
-    image[np.all(image[:, :, :3] == [0, 0, 0], axis=-1)] = [0, 0, 0, 0]
-    cv2.imwrite(image_path, image)
-
-    # [3] open the Blender file
-    bpy.ops.wm.open_mainfile(filepath=blender_file_path)
-    
-    # [4] replace the packed image data with the new image
-    packed_image_name = 'colors.png'
-    image_found = False
-    for image in bpy.data.images:
-        if image.name == packed_image_name:
-            log(f"Found packed image: {image.name}")
-            image.filepath = image_path
-            log(f"Setting image filepath to: {image.filepath}")
-            image.source = 'FILE'
-            image.reload()
-            image.pack()
-            image_found = True
-            log("Image replaced and repacked successfully.")
-            break
+        # [1] index which tiles of the bake are painted at all
+        coverage = None
+        if tile_size > 0:
+            with span('coverage_index', map='color'):
+                coverage = build_coverage_index(image, tile_size)
+            log(f"Color map coverage: {coverage.mean() * 100:.1f}% of {tile_size}px tiles")
 
-    if not image_found:
-        log(f"Image named '{packed_image_name}' not found in the blend file.")
-        return
+        # [2] only the adjustment chain changed: start from the kept render
+        final_image = load_cached_render(work_dir, slot, record, render_key) if incremental else None
+        if final_image is None:
+            # [3] convert black pixels to transparent; empty tiles are already transparent black
+            with span('alpha_strip', map='color'):
+                rgba_image = create_memmap(scratch_dir, 'colors_rgba', image.shape[:2] + (4,), np.uint8)
+                for block in iter_blocks(image.shape, coverage, tile_size, strip_rows):
+                    rgba_image[block] = strip_black_to_alpha(image[block])
+                if debug_intermediates:
+                    write_image(intermediate_path(os.path.join(work_dir, 'colors_masked'), options), rgba_image, 'intermediate', options)
 
-    # [5] set resolution and sample count and output path
-    bpy.context.scene.render.resolution_x = resolution_arg
-    bpy.context.scene.render.resolution_y = resolution_arg
-    bpy.context.scene.render.resolution_percentage = 100
-    bpy.context.scene.cycles.samples = samples_arg
-    bpy.context.scene.render.filepath = pre_path
-    bpy.context.scene.render.image_settings.file_format = 'PNG'
+            # [4] open the Blender file, apply this host's Cycles profile and replace the packed image data with the new image
+            open_template(blender_file_path)
+            apply_cycles_profile(options['cycles_profile'], resolution_arg)
+            with span('set_template_image', map='color'):
+                found = set_template_image('colors.png', rgba_image, scratch_dir)
+            del rgba_image
+            if not found:
+                return
 
-    # [6] render painted colors
-    log("Rendering painted color map...")
-    bpy.ops.render.render(write_still=True)
-    log("Painted color map generated!")
-
-    # [7] load the final rendered image
-    final_image = cv2.imread(pre_path, cv2.IMREAD_UNCHANGED)
-    
-    # [8] check for alpha channel and separate color channels if present
-    if final_image.shape[2] == 4:
-        color_channels, alpha_channel = final_image[..., :3], final_image[..., 3]
-    else:
-        color_channels = final_image
+            # [5] set resolution and sample count and output path
+            if coverage is not None:
+                coverage = dilate_coverage_index(coverage)
+            apply_thread_budget(options['threads'])
+            bpy.context.scene.render.resolution_x = resolution_arg
+            bpy.context.scene.render.resolution_y = resolution_arg
+            bpy.context.scene.render.resolution_percentage = 100
+            apply_sampling(samples_arg, options['noise_threshold'], options['min_samples'])
+            set_render_border(coverage, tile_size, resolution_arg)
+            output_path = set_render_output(output_base, debug_intermediates, options)
 
-    # [9] color correct hue
-    hsv_image = cv2.cvtColor(color_channels, cv2.COLOR_RGB2HSV)
-    hsv_image[:, :, 0] = (hsv_image[:, :, 0].astype(int) - 2) % 180  # Adjust hue by -2 degrees
-    # hsv_image[:, :, 1] = np.maximum(hsv_image[:, :, 1] - 10, 0)   # Lower saturation by 4% of 255
-    hsv_image[:, :, 2] = np.clip(hsv_image[:, :, 2] * 1.05, 0, 255) # Increase value by 5%
-    adjusted_rgb = cv2.cvtColor(hsv_image, cv2.COLOR_HSV2RGB)
+            # [6] render painted colors, split over tile workers if asked
+            log("Rendering painted color map...")
+            with span('render', map='color', resolution=resolution_arg, samples=samples_arg, tiles=options['render_tiles']):
+                if options['render_tiles'] > 1:
+                    final_image = render_distributed(output_path, cv2.IMREAD_UNCHANGED, scratch_dir, 'pre_colors', coverage, options, debug_intermediates)
+                else:
+                    bpy.ops.render.render(write_still=True)
+            log("Painted color map generated!")
+
+            # [7] load the final rendered image
+            if options['render_tiles'] <= 1:
+                with span('load_render', map='color'):
+                    final_image = load_render_output(output_path, cv2.IMREAD_UNCHANGED, scratch_dir, 'pre_colors', debug_intermediates)
+            if incremental:
+                cache_render(work_dir, slot, record, render_key, final_image)
+        elif coverage is not None:
+            coverage = dilate_coverage_index(coverage)
+        del image
+        adjusted_image = create_memmap(scratch_dir, 'final_colors', final_image.shape, np.uint8)
+
+        # [8] compile the preset's adjustment chain into a lookup table, or load it from the cache
+        lut = load_color_lut(color_chain, os.path.join(current_blend_dir, LUT_CACHE_DIRNAME)) if color_chain else None
+
+        # tiles away from every island stay transparent black
+        with span('hue_value_adjust', map='color', preset=options['color_preset']):
+            for block in iter_blocks(final_image.shape, coverage, tile_size, strip_rows):
+                # [9] color correct in a single lookup per pixel, alpha included
+                if lut is not None:
+                    apply_color_lut(lut, final_image[block], adjusted_image[block])
 
-    # [10] combine with alpha channel if it was present
-    if final_image.shape[2] == 4:
-        adjusted_rgb = np.dstack((adjusted_rgb, alpha_channel))
+                # [10] an empty chain leaves the render as is
+                else:
+                    adjusted_image[block] = final_image[block]
 
-    # [11] save adjusted image
-    adjusted_image_path = os.path.join(current_blend_dir, f'final_colors_{seed}.png')
-    cv2.imwrite(adjusted_image_path, adjusted_rgb)
+        # [11] save adjusted image, recorded as done only once it is on disk
+        on_written = None
+        if incremental:
+            record['final'] = final_key
+            on_written = lambda: save_stage_record(work_dir, slot, record)
+        with span('final_write', map='color'):
+            write_image(adjusted_image_path, adjusted_image, 'final', options, on_written)
+        del final_image, adjusted_image
+    finally:
+        remove_after_writes(scratch_dir)
 
     log("Hue adjusted and final image saved!")
+    return adjusted_image_path
+
+def get_optional_arg(args, name, default):
+    if name in args:
+        return args[args.index(name) + 1]
+    return default
+
+def set_optional_arg(args, name, value):
+    args = list(args)
+    if name in args:
+        args[args.index(name) + 1] = str(value)
+    else:
+        args += [name, str(value)]
+    return args
+
+# template each paint job opens, used as the -b file of its worker process
+JOB_TEMPLATES = {
+    'normal': 'painter.blend',
+    'color': 'color_painter.blend',
+}
+
+def spawn_painter(template_path, args):
+    command = [
+        bpy.app.binary_path,
+        "-b", template_path,
+        # without it Blender exits 0 even when this script raised, and a failed job would pass
+        "--python-exit-code", "1",
+        "-P", os.path.abspath(__file__),
+        "--",
+    ] + args
+    return subprocess.Popen(command, env=trace_child_env())
+
+def wait_for_painters(processes, start):
+    # poll so each process gets its own finish time
+    durations = {}
+    failed = []
+    while len(durations) < len(processes):
+        for name, process in processes.items():
+            if name in durations or process.poll() is None:
+                continue
+            durations[name] = time.perf_counter() - start
+            if process.returncode != 0:
+                failed.append(name)
+        time.sleep(0.1)
+    return durations, failed
+
+def run_paint_jobs_parallel(args, threads):
+    current_blend_dir = os.path.dirname(bpy.data.filepath)
+
+    # [0] split the cores between the two jobs unless a budget was given
+    if threads <= 0:
+        threads = max(1, (os.cpu_count() or 2) // len(JOB_TEMPLATES))
+
+    # [1] start one background Blender per paint job
+    start = time.perf_counter()
+    processes = {}
+    for job, template in JOB_TEMPLATES.items():
+        job_args = set_optional_arg(args, 'job', job)
+        job_args = set_optional_arg(job_args, 'parallel', 0)
+        job_args = set_optional_arg(job_args, 'threads', threads)
+        log(f"Starting {job} paint worker with {threads} threads...")
+        processes[job] = spawn_painter(os.path.join(current_blend_dir, template), job_args)
+
+    # [2] wait for both jobs and time each one
+    durations, failed = wait_for_painters(processes, start)
+    wall_time = time.perf_counter() - start
+
+    if failed:
+        log(f"Paint workers failed: {', '.join(failed)}")
+        sys.exit(1)
+
+    # [3] report the saving against running the jobs back to back; each job was timed while the other
+    # competed for cores and memory bandwidth, so their sum only bounds the back-to-back time from above
+    sequential_bound = sum(durations.values())
+    for job, duration in durations.items():
+        log(f"{job} paint job took {duration:.2f}s")
+    log(f"Parallel paint wall time {wall_time:.2f}s vs at most {sequential_bound:.2f}s back to back "
+        f"(saved at most {sequential_bound - wall_time:.2f}s)")
+
+def paint_seed_batch(resolution_arg, samples_arg, seeds, options):
+    # all normal variants first, then all color variants, so each template is opened once
+    variants = {seed: {'seed': seed} for seed in seeds}
+    for seed in seeds:
+        start = time.perf_counter()
+        with span('paint_normal', seed=seed):
+            variants[seed]['normal'] = paint_normal_map(resolution_arg, samples_arg, seed, options)
+        variants[seed]['normal_time'] = time.perf_counter() - start
+    for seed in seeds:
+        start = time.perf_counter()
+        with span('paint_color', seed=seed):
+            variants[seed]['color'] = paint_color_map(resolution_arg, samples_arg, seed, options)
+        variants[seed]['color_time'] = time.perf_counter() - start
+    finish_image_writes()
+    return [variants[seed] for seed in seeds]
 
+# baked inputs every paint job reads from its work directory
+BAKED_INPUTS = ('normals.npy', 'colors.npy', 'normals.png', 'colors.png')
 
+def run_seed_batch(args, seeds, workers, threads, manifest_path, work_dir=None):
+    current_blend_dir = os.path.dirname(bpy.data.filepath)
+    if work_dir is None:
+        work_dir = current_blend_dir
+    start = time.perf_counter()
+    workers = max(1, min(workers, len(seeds)))
+
+    if workers == 1:
+        # [0] paint every seed in this process with the templates kept warm
+        resolution_arg = int(args[args.index('render_resolution') + 1])
+        samples_arg = int(args[args.index('samples') + 1])
+        options = read_paint_options(lambda name: get_optional_arg(args, name, None))
+        options['threads'] = threads
+        options['work_dir'] = work_dir
+        variants = paint_seed_batch(resolution_arg, samples_arg, seeds, options)
+        log("Stage memory:\n" + memory_summary(painter_common.trace_events, options['memory_budget']))
+    else:
+        # [1] split the seeds over a bounded number of painter processes
+        if threads <= 0:
+            threads = max(1, (os.cpu_count() or workers) // workers)
+        processes = {}
+        part_paths = []
+        for index in range(workers):
+            part_path = f"{manifest_path}.part{index}"
+            part_paths.append(part_path)
+            # a part left by an earlier run must never be merged as this worker's result
+            if os.path.exists(part_path):
+                os.remove(part_path)
+
+            # each worker paints in its own directory so intermediates never collide
+            worker_dir = os.path.join(os.path.dirname(manifest_path), f'worker_{index}')
+            os.makedirs(worker_dir, exist_ok=True)
+            for name in BAKED_INPUTS:
+                if not os.path.exists(os.path.join(work_dir, name)):
+                    continue
+                shutil.copyfile(os.path.join(work_dir, name), os.path.join(worker_dir, name))
+
+            worker_args = set_optional_arg(args, 'seeds', ','.join(seeds[index::workers]))
+            worker_args = set_optional_arg(worker_args, 'workers', 1)
+            worker_args = set_optional_arg(worker_args, 'threads', threads)
+            worker_args = set_optional_arg(worker_args, 'manifest', part_path)
+            worker_args = set_optional_arg(worker_args, 'work_dir', worker_dir)
+            log(f"Starting variant worker {index} with {threads} threads...")
+            processes[index] = spawn_painter(os.path.join(current_blend_dir, JOB_TEMPLATES['normal']), worker_args)
+
+        durations, failed = wait_for_painters(processes, start)
+        failed += [index for index, part_path in enumerate(part_paths) if index not in failed and not os.path.exists(part_path)]
+        if failed:
+            log(f"Variant workers failed: {', '.join(str(index) for index in failed)}")
+            sys.exit(1)
+
+        # [2] merge the per-worker manifests back into seed order
+        painted = {}
+        for part_path in part_paths:
+            with open(part_path) as f:
+                for variant in json.load(f)['variants']:
+                    painted[variant['seed']] = variant
+            os.remove(part_path)
+        variants = [painted[seed] for seed in seeds]
+
+    # [3] write the manifest with throughput
+    wall_time = time.perf_counter() - start
+    manifest = {
+        'seeds': seeds,
+        'workers': workers,
+        'wall_time': wall_time,
+        'variants_per_minute': len(seeds) * 60.0 / wall_time if wall_time > 0 else 0.0,
+        'variants': variants,
+    }
+    os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    log(f"Painted {len(seeds)} variants with {workers} workers in {wall_time:.2f}s "
+        f"({manifest['variants_per_minute']:.2f} variants/min), manifest: {manifest_path}")
+
+def run_paint_job(job):
+    # job is a dict sent by the add-on's painter worker client
+    painter_common.trace_id = job.get('trace_id', painter_common.trace_id)
+    painter_common.TRACE_FILE = job.get('trace_file', painter_common.TRACE_FILE)
+    resolution_arg = int(job['render_resolution'])
+    samples_arg = int(job['samples'])
+    seed = str(job['seed'])
+    options = read_paint_options(job.get)
+
+    # the add-on applies the output as soon as it gets the reply, so every write must be done by then
+    try:
+        if job['job'] == 'normal':
+            with span('paint_normal', seed=seed):
+                return paint_normal_map(resolution_arg, samples_arg, seed, options)
+        if job['job'] == 'color':
+            with span('paint_color', seed=seed):
+                return paint_color_map(resolution_arg, samples_arg, seed, options)
+        raise ValueError(f"Unknown paint job: {job['job']}")
+    finally:
+        finish_image_writes()
+        log("Stage memory:\n" + memory_summary(painter_common.trace_events, options['memory_budget']))
+
+# a worker with no job for this long exits; the add-on starts a new one for the next job
+WORKER_IDLE_TIMEOUT = 30 * 60
+# how often an idle worker checks that the add-on that started it is still running
+WORKER_PARENT_CHECK_INTERVAL = 5.0
+
+def serve(port):
+    # long-lived worker: keeps Blender, cv2 and the template loaded between paint jobs.
+    # It serves the one add-on that started it and exits when that add-on goes away, since it runs
+    # in its own session and nothing else would stop it
+    global progress_hook
+    authkey = bytes.fromhex(os.environ['AUTO_PAINTER_AUTHKEY'])
+    parent_pid = os.getppid()
+    log(f"Painter worker listening on port {port}...")
+    with Listener(('127.0.0.1', port), authkey=authkey) as listener, listener.accept() as connection:
+        while True:
+            # [0] wait for a job while the add-on is still there
+            idle_since = time.monotonic()
+            while not connection.poll(WORKER_PARENT_CHECK_INTERVAL):
+                # on POSIX an orphaned worker is re-parented; on Windows only the idle timeout applies
+                if os.getppid() != parent_pid:
+                    log("Painter worker's add-on exited, shutting down.")
+                    return
+                if time.monotonic() - idle_since > WORKER_IDLE_TIMEOUT:
+                    log(f"Painter worker idle for {WORKER_IDLE_TIMEOUT}s, shutting down.")
+                    return
+            try:
+                job = connection.recv()
+            except (EOFError, OSError):
+                log("Painter worker lost its add-on connection, shutting down.")
+                return
+
+            if job.get('command') == 'shutdown':
+                log("Painter worker shutting down.")
+                return
+
+            # [1] run the job, streaming its log lines back as progress
+            start = time.perf_counter()
+            progress_hook = lambda message: connection.send({'status': 'progress', 'message': message})
+            try:
+                output_path = run_paint_job(job)
+            except Exception as e:
+                progress_hook = None
+                flush_trace()
+                log(f"Paint job failed: {traceback.format_exc()}")
+                connection.send({'status': 'error', 'error': str(e)})
+                continue
+            progress_hook = None
+            flush_trace()
+
+            if output_path is None:
+                connection.send({'status': 'error', 'error': f"{job['job']} paint job produced no output"})
+                continue
+            connection.send({'status': 'ok', 'output_path': output_path, 'duration': time.perf_counter() - start})
 
 def main():
     log("Starting main function...")
@@ -201,16 +1559,81 @@ def main():
     # [0] parse cli arguments (resolution, samples, and seed)
     log(f"Command-line arguments received: {sys.argv}")
     args = sys.argv[sys.argv.index("--") + 1:]  # Get all args after "--"
+    start_memory_monitor()
+    # Blender was started with a template open; remember its stat, so open_template does not load it again
+    if bpy.data.filepath:
+        open_template_stat['stat'] = template_stat(bpy.data.filepath)
+    if 'serve' in args:
+        serve(int(args[args.index('serve') + 1]))
+        return
+    if 'tile_worker' in args:
+        record_startup_span()
+        try:
+            run_tile_worker(args[args.index('tile_worker') + 1], int(get_optional_arg(args, 'threads', 0)))
+        finally:
+            flush_trace()
+        return
+
+    record_startup_span()
+
+    # a run started without the add-on is its own trace and reports its own summary
+    is_root = not painter_common.trace_id
+    if is_root:
+        painter_common.trace_id = f"{os.getpid()}-{int(time.time())}"
+
+    try:
+        with span('painter_main'):
+            run_main(args)
+    finally:
+        flush_trace()
+    if is_root:
+        log("Stage timings:\n" + trace_summary(painter_common.trace_id))
+
+def run_main(args):
+    # tune the templates' Cycles settings for this host instead of painting
+    if 'autotune' in args:
+        run_autotune(args)
+        return
+
     resolution_arg = int(args[args.index('render_resolution') + 1])
     samples_arg = int(args[args.index('samples') + 1])
     seed = args[args.index('seed') + 1]
+    job = get_optional_arg(args, 'job', 'all')
+    parallel = get_optional_arg(args, 'parallel', '0') == '1'
+    options = read_paint_options(lambda name: get_optional_arg(args, name, None))
+    threads = options['threads']
+    work_dir = options['work_dir']
     log(f"SEED IN AUTO_PAINTER.py: {seed}")
 
-    # [1] auto paint normal map
-    paint_normal_map(resolution_arg, samples_arg, seed)
+    # [1] paint several seeds from one bake
+    seeds = get_optional_arg(args, 'seeds', None)
+    if seeds is not None:
+        workers = int(get_optional_arg(args, 'workers', 1))
+        default_manifest = os.path.join(os.path.dirname(bpy.data.filepath), f'variants_{int(time.time())}', 'manifest.json')
+        manifest_path = get_optional_arg(args, 'manifest', default_manifest)
+        run_seed_batch(args, seeds.split(','), workers, threads, manifest_path, work_dir)
+        return
+
+    # [2] run both paint jobs in separate worker processes
+    if job == 'all' and parallel:
+        run_paint_jobs_parallel(args, threads)
+        return
+
+    start = time.perf_counter()
+
+    # [3] auto paint normal map
+    if job in ('all', 'normal'):
+        with span('paint_normal', seed=seed):
+            paint_normal_map(resolution_arg, samples_arg, seed, options)
+
+    # [4] auto paint color map; the normal map's final write overlaps with it
+    if job in ('all', 'color'):
+        with span('paint_color', seed=seed):
+            paint_color_map(resolution_arg, samples_arg, seed, options)
+    finish_image_writes()
+    log("Stage memory:\n" + memory_summary(painter_common.trace_events, options['memory_budget']))
 
-    # [2] auto paint color map
-    paint_color_map(resolution_arg, samples_arg, seed)
+    log(f"Paint job '{job}' took {time.perf_counter() - start:.2f}s")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,1211 @@
+import bpy
+import os
+import subprocess
+import random
+import socket
+import time
+import array
+import hashlib
+import shutil
+import json
+import numpy as np
+import uuid
+import re
+import sys
+import signal
+import threading
+import collections
+from multiprocessing.connection import Client
+
+# the add-on is this package: install the auto_painter_addon folder (zipped) from Preferences > Add-ons.
+# painter_common.py next to this file holds the tracing helpers and memory cost model it shares with
+# auto_painter.py; painters started from here find it through AUTO_PAINTER_COMMON_DIR
+ADDON_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ADDON_DIR)
+os.environ.setdefault('AUTO_PAINTER_COMMON_DIR', ADDON_DIR)
+import painter_common
+from painter_common import span, flush_trace, trace_child_env, trace_summary, estimate_paint_memory
+
+bl_info = {
+    "name": "Auto Painter",
+    "blender": (2, 90, 0),
+    "category": "Object",
+}
+
+random_seed = random.randint(0, 99999)
+
+log_handle = None
+
+def log(message):
+    # keep the log open for the whole session instead of reopening it per message
+    global log_handle
+    if log_handle is None:
+        log_handle = open(painter_common.LOG_FILE, "a", buffering=1)
+    log_handle.write(message + "\n")
+
+# ------------------ TRACING ------------------
+
+def start_trace():
+    painter_common.trace_id = uuid.uuid4().hex[:12]
+    log(f"Trace id: {painter_common.trace_id}")
+
+# ------------------ BAKE CACHE ------------------
+
+BAKE_CACHE_DIRNAME = 'bake_cache'
+BAKE_CACHE_MAX_BYTES = 2 * 1024 ** 3
+
+bake_cache_stats = {'hits': 0, 'misses': 0}
+
+# node properties that only affect the node editor, not the bake result
+NODE_UI_PROPERTIES = {
+    'name', 'label', 'location', 'width', 'width_hidden', 'height', 'dimensions',
+    'select', 'show_options', 'show_preview', 'show_texture', 'hide',
+    'use_custom_color', 'color', 'bl_idname', 'bl_label', 'bl_description',
+    'bl_icon', 'bl_static_type', 'bl_width_default', 'bl_width_min',
+    'bl_width_max', 'bl_height_default', 'bl_height_min', 'bl_height_max',
+}
+
+def hash_floats(digest, collection, attribute, size):
+    values = array.array('f', [0.0]) * (len(collection) * size)
+    collection.foreach_get(attribute, values)
+    digest.update(values.tobytes())
+
+def hash_ints(digest, collection, attribute, size):
+    values = array.array('i', [0]) * (len(collection) * size)
+    collection.foreach_get(attribute, values)
+    digest.update(values.tobytes())
+
+def hash_mesh(digest, obj):
+    # hash the evaluated mesh so modifiers are part of the key
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    obj_eval = obj.evaluated_get(depsgraph)
+    mesh = obj_eval.to_mesh()
+    try:
+        hash_floats(digest, mesh.vertices, 'co', 3)
+        hash_ints(digest, mesh.loops, 'vertex_index', 1)
+        hash_ints(digest, mesh.polygons, 'loop_start', 1)
+        hash_ints(digest, mesh.polygons, 'use_smooth', 1)
+        uv_layer = mesh.uv_layers.active
+        if uv_layer is not None:
+            hash_floats(digest, uv_layer.data, 'uv', 2)
+    finally:
+        obj_eval.to_mesh_clear()
+
+def hash_image(digest, image):
+    # by content, not name: the add-on re-points the color image at a rewritten file, and artists paint textures
+    digest.update(f"image={image.name}:{image.filepath}".encode())
+    path = bpy.path.abspath(image.filepath, library=image.library)
+    if image.packed_file is None and not image.is_dirty and image.source == 'FILE' and os.path.exists(path):
+        stat = os.stat(path)
+        digest.update(f"{stat.st_mtime_ns}:{stat.st_size}".encode())
+        return
+    # packed, generated or painted and not saved yet: only the pixels tell
+    pixels = array.array('f', [0.0]) * len(image.pixels)
+    image.pixels.foreach_get(pixels)
+    digest.update(pixels.tobytes())
+
+def hash_node_tree(digest, mat):
+    if not mat.use_nodes:
+        digest.update(repr(tuple(mat.diffuse_color)).encode())
+        return
+
+    # only nodes that feed the active output can change the bake
+    nodes = mat.node_tree.nodes
+    pending = [node for node in nodes if node.type == 'OUTPUT_MATERIAL' and node.is_active_output]
+    visited = set()
+    while pending:
+        node = pending.pop()
+        if node.name in visited:
+            continue
+        visited.add(node.name)
+        for socket_input in node.inputs:
+            for link in socket_input.links:
+                pending.append(link.from_node)
+
+    for name in sorted(visited):
+        node = nodes[name]
+        digest.update(node.bl_idname.encode())
+        for prop in node.bl_rna.properties:
+            if prop.identifier in NODE_UI_PROPERTIES or prop.type not in {'BOOLEAN', 'INT', 'FLOAT', 'ENUM', 'STRING'}:
+                continue
+            value = getattr(node, prop.identifier)
+            if hasattr(value, '__len__') and not isinstance(value, str):
+                value = tuple(value)
+            digest.update(f"{prop.identifier}={value!r}".encode())
+        image = getattr(node, 'image', None)
+        if image is not None:
+            hash_image(digest, image)
+        for socket_input in node.inputs:
+            if socket_input.links:
+                link = socket_input.links[0]
+                digest.update(f"{socket_input.identifier}<{link.from_node.name}.{link.from_socket.identifier}".encode())
+            elif hasattr(socket_input, 'default_value'):
+                value = socket_input.default_value
+                if hasattr(value, '__len__'):
+                    value = tuple(value)
+                digest.update(f"{socket_input.identifier}={value!r}".encode())
+
+def bake_cache_key(obj, mat, w, map_type):
+    digest = hashlib.sha256()
+    digest.update(f"{map_type}:{w}".encode())
+    hash_mesh(digest, obj)
+    hash_node_tree(digest, mat)
+    return digest.hexdigest()
+
+def bake_cache_entry(cache_dir, key, filepath):
+    return os.path.join(cache_dir, key + os.path.splitext(filepath)[1])
+
+def bake_cache_lookup(cache_dir, key, filepath):
+    entry = bake_cache_entry(cache_dir, key, filepath)
+    try:
+        shutil.copyfile(entry, filepath)
+        os.utime(entry)  # mark as recently used
+    except FileNotFoundError:
+        # missing, or evicted by another process sharing the cache
+        bake_cache_stats['misses'] += 1
+        return False
+    bake_cache_stats['hits'] += 1
+    return True
+
+def bake_cache_store(cache_dir, key, filepath):
+    os.makedirs(cache_dir, exist_ok=True)
+    entry = bake_cache_entry(cache_dir, key, filepath)
+    # per-process temp name: headless batch workers can store the same entry at once
+    partial = f"{entry}.{os.getpid()}.tmp"
+    shutil.copyfile(filepath, partial)
+    os.replace(partial, entry)
+
+    # evict least recently used entries until the cache fits its size budget
+    # other processes may evict the same entries meanwhile, so vanished files are skipped
+    entries = []
+    for name in os.listdir(cache_dir):
+        if name.endswith('.tmp'):
+            continue
+        try:
+            stat = os.stat(os.path.join(cache_dir, name))
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, os.path.join(cache_dir, name)))
+    entries.sort()
+    total = sum(size for _, size, _ in entries)
+    while total > BAKE_CACHE_MAX_BYTES and len(entries) > 1:
+        _, size, oldest = entries.pop(0)
+        total -= size
+        try:
+            os.remove(oldest)
+        except FileNotFoundError:
+            continue
+        log(f"Evicted bake cache entry {os.path.basename(oldest)}")
+
+# ------------------ MATERIAL WIRING ------------------
+
+# nodes and images the add-on owns carry this tag, so re-runs update them instead of adding more
+AUTO_PAINTER_TAG = 'auto_painter'
+# names of images added by versions that did not tag them, per map
+UNTAGGED_PAINTER_IMAGES = {
+    'normal': re.compile(r'^final_\d+(_preview)?\.png(\.\d{3})?$'),
+    'color': re.compile(r'^final_colors_\d+(_preview)?\.png(\.\d{3})?$'),
+    'bake': re.compile(r'^Bake_Image(\.\d{3})?$'),
+}
+
+def painter_image_map(image):
+    # which map an image was made for, or None if the add-on did not make it
+    if image.get(AUTO_PAINTER_TAG) is not None:
+        return image[AUTO_PAINTER_TAG]
+    for map_type, pattern in UNTAGGED_PAINTER_IMAGES.items():
+        if pattern.match(image.name):
+            return map_type
+    return None
+
+def tagged_node(nodes, map_type, node_type, location):
+    # the one node of this map in the material, replaced only if something else took its name
+    name = f"Auto Painter {map_type}"
+    node = nodes.get(name)
+    if node is not None and node.bl_idname != node_type:
+        nodes.remove(node)
+        node = None
+    if node is None:
+        node = nodes.new(type=node_type)
+        node.name = name
+        node.label = name
+        node.location = location
+    node[AUTO_PAINTER_TAG] = map_type
+
+    # drop copies of this map left behind by earlier runs
+    for other in list(nodes):
+        if other != node and other.type == 'TEX_IMAGE' and other.image is not None and painter_image_map(other.image) == map_type:
+            nodes.remove(other)
+    return node
+
+def load_tagged_image(mat, map_type, filepath):
+    # one image datablock per material and map, pointed at the newest file
+    name = f"{mat.name} {map_type}"
+    image = bpy.data.images.get(name)
+    if image is not None and image.get(AUTO_PAINTER_TAG) == map_type:
+        image.filepath = filepath
+        image.reload()
+    else:
+        image = bpy.data.images.load(filepath, check_existing=False)
+        image.name = name
+        image[AUTO_PAINTER_TAG] = map_type
+    return image
+
+def purge_painter_images():
+    # superseded painter images no node uses any more
+    purged = 0
+    for image in list(bpy.data.images):
+        if image.users == 0 and painter_image_map(image) is not None:
+            bpy.data.images.remove(image)
+            purged += 1
+    if purged:
+        log(f"Purged {purged} unused painter images")
+
+# ------------------ HELPER FUNCTIONS ------------------
+
+# write intermediate PNGs next to the raw buffers for debugging
+DEBUG_INTERMEDIATES = False
+# re-running Auto Paint keeps the renders of unchanged inputs and only redoes the post-processing after a change
+INCREMENTAL_PAINT = True
+
+# progressive Auto Paint: a quick preview is applied first, then refined with adaptive sampling
+FINAL_SIZE = 4096
+FINAL_SAMPLES = 100
+PREVIEW_SIZE = 1024
+PREVIEW_SAMPLES = 16
+REFINE_MAX_SAMPLES = 256
+REFINE_NOISE_THRESHOLD = 0.01
+
+# memory budget of one paint job in MiB, 0 for none; with several jobs per node give each its share
+MEMORY_BUDGET_MB = int(os.environ.get('AUTO_PAINTER_MEMORY_BUDGET', '0'))
+# tilings auto_paint tries, fewest tiles first, before it lowers the resolution; never below MIN_PAINT_SIZE
+MEMORY_TILINGS = (1, 2, 4)
+MIN_PAINT_SIZE = 512
+# lines of a one-shot painter's output kept for the error report; the rest only goes to the log
+CHILD_OUTPUT_TAIL = 40
+
+# custom property naming an object's color preset (a preset name or a .json path next to the .blend)
+COLOR_PRESET_PROPERTY = 'auto_painter_color_preset'
+
+def save_raw_pixels(image, filepath):
+    # store the bake as uint8 BGRA, top row first, the layout cv2 would decode from a PNG
+    w, h = image.size
+    pixels = np.empty(w * h * 4, dtype=np.float32)
+    image.pixels.foreach_get(pixels)
+    pixels = (pixels * 255 + 0.5).astype(np.uint8).reshape(h, w, 4)
+    np.save(filepath, np.ascontiguousarray(pixels[::-1, :, [2, 1, 0, 3]]))
+
+# Blender's PNG compression percent for the debug copies of the bakes; intermediates are written for speed
+DEBUG_PNG_COMPRESSION = 0
+
+def save_debug_png(image, filepath):
+    # save_render writes with the scene's output settings, so they are swapped for the write and put back after
+    image_settings = bpy.context.scene.render.image_settings
+    saved = (image_settings.file_format, image_settings.compression)
+    image_settings.file_format = 'PNG'
+    image_settings.compression = DEBUG_PNG_COMPRESSION
+    start = time.perf_counter()
+    try:
+        image.save_render(filepath)
+    finally:
+        image_settings.file_format, image_settings.compression = saved
+    log(f"Wrote {filepath}: {os.path.getsize(filepath) / 2 ** 20:.1f} MiB in {time.perf_counter() - start:.2f}s")
+
+def plan_paint_memory(render_size, budget_mb):
+    # (resolution, tiles) of the largest paint job up to render_size that fits the budget, or None;
+    # tiles render one at a time in a single worker, so tiling trades time for memory
+    if budget_mb <= 0:
+        return render_size, 1
+    size = render_size
+    while size >= min(MIN_PAINT_SIZE, render_size):
+        for render_tiles in MEMORY_TILINGS:
+            if estimate_paint_memory(size, render_tiles, render_workers=1) <= budget_mb * 2 ** 20:
+                return size, render_tiles
+        size //= 2
+    return None
+
+# map types the bake stage can produce: output file, Cycles bake type and the bake passes it needs
+BAKE_MAP_TYPES = {
+    'normal': {'file': 'normals.npy', 'type': 'NORMAL', 'passes': {}},
+    'color': {'file': 'colors.npy', 'type': 'DIFFUSE',
+              'passes': {'use_pass_direct': False, 'use_pass_indirect': False, 'use_pass_color': True}},
+    'roughness': {'file': 'roughness.npy', 'type': 'ROUGHNESS', 'passes': {}},
+    'ao': {'file': 'ao.npy', 'type': 'AO', 'passes': {}},
+    'emission': {'file': 'emission.npy', 'type': 'EMIT', 'passes': {}},
+}
+# the maps the paint pipeline reads
+PAINT_BAKE_MAPS = ('normal', 'color')
+
+# seconds per map of the last bake_maps run
+bake_map_times = {}
+
+def bake_target(w):
+    # the pooled target is found by its tag and size, so it survives reloads and saved .blend files
+    for image in bpy.data.images:
+        if image.get(AUTO_PAINTER_TAG) == 'bake' and tuple(image.size) == (w, w):
+            return image
+    image = bpy.data.images.new(name=f"Auto Painter bake {w}", width=w, height=w, float_buffer=False)
+    image[AUTO_PAINTER_TAG] = 'bake'
+    return image
+
+def release_bake_targets():
+    for image in [image for image in bpy.data.images if image.get(AUTO_PAINTER_TAG) == 'bake']:
+        bpy.data.images.remove(image)
+
+def bake_maps(obj, out_dir, w, map_types, cache_dir=None, debug_intermediates=False):
+    # bakes each map type into out_dir with one scene setup and one pooled target,
+    # yielding before every bake so a modal operator can redraw in between
+    bake_map_times.clear()
+
+    if not obj.data.materials:
+        mat = bpy.data.materials.new(name="Material")
+        obj.data.materials.append(mat)
+    else:
+        mat = obj.active_material
+
+    # [0] restore whatever the cache has; mesh, UVs, material and resolution are unchanged for those
+    pending = []
+    for map_type in map_types:
+        filepath = os.path.join(out_dir, BAKE_MAP_TYPES[map_type]['file'])
+        key = bake_cache_key(obj, mat, w, map_type) if cache_dir is not None else None
+        if key is not None and bake_cache_lookup(cache_dir, key, filepath):
+            log(f"{map_type.capitalize()} map restored from bake cache ({key[:12]})")
+            bake_map_times[map_type] = 0.0
+            continue
+        pending.append((map_type, filepath, key))
+    if not pending:
+        return
+
+    # [1] set up the target node and the settings every bake shares, once
+    with span('bake_setup', resolution=w):
+        if not mat.use_nodes:
+            mat.use_nodes = True
+        nodes = mat.node_tree.nodes
+        tex_image_node = tagged_node(nodes, 'bake', 'ShaderNodeTexImage', (-300, 300))
+        tex_image_node.image = bake_target(w)
+        tex_image_node.select = True
+        nodes.active = tex_image_node
+
+        bake_settings = bpy.context.scene.render.bake
+        bake_settings.use_selected_to_active = False
+        bake_settings.use_cage = False
+        bake_settings.cage_extrusion = 0.0
+        bake_settings.max_ray_distance = 0.0
+        bake_settings.use_clear = True
+
+    # [2] bake each map into the same target and write it straight out
+    for map_type, filepath, key in pending:
+        yield f"Baking {map_type} map"
+        log(f"Baking {map_type} map of '{obj.name}'")
+        spec = BAKE_MAP_TYPES[map_type]
+        start = time.perf_counter()
+        with span('bake', map=map_type, resolution=w):
+            bpy.context.scene.cycles.bake_type = spec['type']
+            for name, value in spec['passes'].items():
+                setattr(bake_settings, name, value)
+            bpy.ops.object.bake(type=spec['type'])
+            save_raw_pixels(tex_image_node.image, filepath)
+            if debug_intermediates:
+                save_debug_png(tex_image_node.image, os.path.splitext(filepath)[0] + '.png')
+        bake_map_times[map_type] = time.perf_counter() - start
+
+        if key is not None:
+            bake_cache_store(cache_dir, key, filepath)
+        log(f"{map_type.capitalize()} map baked to {filepath} ({os.path.getsize(filepath) / 2 ** 20:.1f} MiB) "
+            f"in {bake_map_times[map_type]:.2f}s")
+
+# ------------------ PAINTER WORKER ------------------
+
+# templates kept open by the persistent painter workers, one worker per template
+WORKER_TEMPLATES = {
+    'normal': 'painter.blend',
+    'color': 'color_painter.blend',
+}
+WORKER_STARTUP_TIMEOUT = 60.0
+
+class PainterWorkerError(Exception):
+    pass
+
+class PainterJobError(Exception):
+    # the worker ran the job and it failed; a one-shot process would fail the same way
+    pass
+
+def child_process_options():
+    # each painter leads its own process group, so the painters and tile workers it starts can be stopped with it
+    if os.name == 'nt':
+        return {'creationflags': subprocess.CREATE_NEW_PROCESS_GROUP}
+    return {'start_new_session': True}
+
+def kill_process_tree(process):
+    # kill a painter started with child_process_options and everything it spawned
+    if os.name == 'nt':
+        subprocess.run(['taskkill', '/F', '/T', '/PID', str(process.pid)], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    else:
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+    process.wait()
+
+class PainterWorker:
+    # client for one long-lived `blender -b <template> -P auto_painter.py -- serve <port>` process
+
+    def __init__(self, job_type):
+        self.job_type = job_type
+        self.process = None
+        self.connection = None
+        self.blend_dir = None
+
+    def is_alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def start(self, blend_dir):
+        self.stop()
+        template_path = os.path.join(blend_dir, WORKER_TEMPLATES[self.job_type])
+        script_path = os.path.join(blend_dir, 'auto_painter.py')
+        if not os.path.exists(template_path) or not os.path.exists(script_path):
+            raise PainterWorkerError(f"Worker files not found in {blend_dir}")
+
+        # [0] pick a free local port and a one-off auth key
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+        authkey = os.urandom(16)
+
+        # [1] start the worker with its template already loaded
+        command = [
+            bpy.app.binary_path,
+            "-b", template_path,
+            "--python-exit-code", "1",
+            "-P", script_path,
+            "--",
+            "serve", str(port)
+        ]
+        env = dict(os.environ, AUTO_PAINTER_AUTHKEY=authkey.hex())
+        log(f"Starting {self.job_type} painter worker on port {port}...")
+        self.process = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                        **child_process_options())
+        self.blend_dir = blend_dir
+
+        # [2] connect once the worker is listening
+        deadline = time.monotonic() + WORKER_STARTUP_TIMEOUT
+        while time.monotonic() < deadline:
+            if not self.is_alive():
+                raise PainterWorkerError(f"{self.job_type} painter worker exited during startup")
+            try:
+                self.connection = Client(('127.0.0.1', port), authkey=authkey)
+                return
+            except ConnectionRefusedError:
+                time.sleep(0.2)
+        self.stop()
+        raise PainterWorkerError(f"{self.job_type} painter worker did not start in time")
+
+    def stop(self):
+        if self.connection is not None:
+            try:
+                self.connection.send({'command': 'shutdown'})
+                self.connection.close()
+            except (OSError, EOFError):
+                pass
+            self.connection = None
+        if self.is_alive():
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                kill_process_tree(self.process)
+        self.process = None
+
+    def submit(self, blend_dir, job):
+        if not self.is_alive() or self.blend_dir != blend_dir:
+            with span('worker_startup', job=self.job_type):
+                self.start(blend_dir)
+        self.connection.send(dict(job, job=self.job_type))
+
+    def poll(self, timeout=0):
+        # forward progress messages and return the final reply once it arrives
+        while self.connection.poll(timeout):
+            reply = self.connection.recv()
+            if reply['status'] == 'progress':
+                paint_progress['detail'] = f"{self.job_type}: {reply['message']}"
+                timeout = 0
+                continue
+            return reply
+        return None
+
+    def kill(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+        if self.process is not None:
+            kill_process_tree(self.process)
+        self.process = None
+
+painter_workers = {job_type: PainterWorker(job_type) for job_type in WORKER_TEMPLATES}
+
+def paint_with_workers(blend_dir, job, poll_timeout=None):
+    # send the job to both workers so normal and color painting overlap,
+    # restarting a worker once if it crashed since the last job;
+    # yields while waiting so a modal operator can keep the UI responsive
+    for attempt in range(2):
+        replies = {}
+        try:
+            for worker in painter_workers.values():
+                worker.submit(blend_dir, job)
+            while len(replies) < len(painter_workers):
+                for job_type, worker in painter_workers.items():
+                    if job_type not in replies:
+                        reply = worker.poll(poll_timeout)
+                        if reply is not None:
+                            replies[job_type] = reply
+                yield "Painting"
+        except (OSError, EOFError) as e:
+            log(f"Painter worker connection lost ({e}), restarting workers...")
+            stop_painter_workers()
+            continue
+
+        for job_type, reply in replies.items():
+            if reply['status'] != 'ok':
+                raise PainterJobError(f"{job_type} paint job failed: {reply['error']}")
+        return replies
+    raise PainterWorkerError("Painter workers crashed twice in a row")
+
+def stop_painter_workers():
+    for worker in painter_workers.values():
+        worker.stop()
+
+def kill_painter_workers():
+    for worker in painter_workers.values():
+        worker.kill()
+
+# ------------------ PROGRESS ------------------
+
+# shared with the panel so a running modal job can show its stage and be cancelled
+paint_progress = {
+    'running': False,
+    'stage': '',
+    'detail': '',
+    'cancel_requested': False,
+}
+
+def redraw_panels(context):
+    if context.screen is None:
+        return
+    for area in context.screen.areas:
+        if area.type == 'VIEW_3D':
+            area.tag_redraw()
+
+# ------------------ MAIN FUNCTIONS ------------------
+
+class ModalPipelineMixin:
+    # runs self.run_pipeline() to completion in execute(), or one stage per
+    # timer tick when invoked from the UI so the viewport stays responsive
+
+    _timer = None
+    _pipeline = None
+    _process = None
+
+    def execute(self, context):
+        # blocking path, used when the operator is called from scripts
+        for stage in self.run_pipeline(context, poll_timeout=None):
+            log(f"Stage: {stage}")
+        self.close_trace()
+        return self._result
+
+    def invoke(self, context, event):
+        if paint_progress['running']:
+            self.report({'WARNING'}, "Auto Paint is already running.")
+            return {'CANCELLED'}
+        return self.start_modal(context)
+
+    def start_modal(self, context):
+        self._pipeline = self.run_pipeline(context, poll_timeout=0)
+        paint_progress.update(running=True, stage="Starting", detail='', cancel_requested=False)
+        wm = context.window_manager
+        self._timer = wm.event_timer_add(0.1, window=context.window)
+        wm.modal_handler_add(self)
+        return {'RUNNING_MODAL'}
+
+    def modal(self, context, event):
+        # no ESC handling: artists keep using the viewport while the job runs
+        if paint_progress['cancel_requested']:
+            self.cancel(context)
+            self.report({'WARNING'}, "Auto Paint cancelled.")
+            return {'CANCELLED'}
+
+        if event.type != 'TIMER':
+            return {'PASS_THROUGH'}
+
+        try:
+            paint_progress['stage'] = next(self._pipeline)
+        except StopIteration:
+            self.finish(context)
+            return self._result
+        except Exception as e:
+            log(f"Auto paint failed: {e}")
+            self.report({'ERROR'}, f"Auto paint failed: {e}")
+            self.cancel(context)
+            return {'CANCELLED'}
+
+        redraw_panels(context)
+        return {'RUNNING_MODAL'}
+
+    def finish(self, context):
+        if self._timer is not None:
+            context.window_manager.event_timer_remove(self._timer)
+            self._timer = None
+        paint_progress.update(running=False, stage='', detail='', cancel_requested=False)
+        redraw_panels(context)
+        self.close_trace()
+
+    def close_trace(self):
+        flush_trace()
+        log(f"Stage timings for trace {painter_common.trace_id}:\n" + trace_summary(painter_common.trace_id))
+
+    def cancel(self, context):
+        # kill the painter children with the painters and tile workers they started; the workers are restarted by the next job
+        log("Auto paint cancelled.")
+        if self._pipeline is not None:
+            self._pipeline.close()
+        if self._process is not None:
+            kill_process_tree(self._process)
+        kill_painter_workers()
+        self.finish(context)
+
+    def bake_stage(self, obj, render_size):
+        # bake every map the painter reads (normals.npy, colors.npy) in one pass
+        current_blend_dir = os.path.dirname(bpy.data.filepath)
+        cache_dir = os.path.join(current_blend_dir, BAKE_CACHE_DIRNAME)
+        yield from bake_maps(obj, current_blend_dir, render_size, PAINT_BAKE_MAPS, cache_dir, DEBUG_INTERMEDIATES)
+        log("Bake times: " + ", ".join(f"{map_type} {seconds:.2f}s" for map_type, seconds in bake_map_times.items()))
+        log(f"Bake cache: {bake_cache_stats['hits']} hits, {bake_cache_stats['misses']} misses")
+
+    def run_painter_process(self, command, poll_timeout):
+        # one-shot background Blender; its output is streamed line by line into the log,
+        # and only the last lines are kept for the error report
+        tail = collections.deque(maxlen=CHILD_OUTPUT_TAIL)
+
+        def forward_output(stream):
+            for line in stream:
+                tail.append(line)
+                log(f"[painter] {line.rstrip()}")
+
+        with span('painter_process'):
+            self._process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+                                             env=trace_child_env(), **child_process_options())
+            reader = threading.Thread(target=forward_output, args=(self._process.stdout,), daemon=True)
+            reader.start()
+            while self._process.poll() is None:
+                if poll_timeout is None:
+                    self._process.wait()
+                yield "Painting"
+            returncode = self._process.returncode
+            reader.join()
+            self._process.stdout.close()
+            self._process = None
+
+        if returncode != 0:
+            output = ''.join(tail)
+            log(f"Blender background process failed with exit code {returncode}")
+            self.report({'ERROR'}, f"Blender background process failed: {output}")
+            return {'CANCELLED'}
+        return {'FINISHED'}
+
+class OBJECT_OT_auto_painter(ModalPipelineMixin, bpy.types.Operator):
+    bl_idname = "object.auto_painter"
+    bl_label = "Auto Paint and Apply Texture"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    _color_preset = 'default'
+
+    progressive: bpy.props.BoolProperty(
+        name="Preview First",
+        description="Apply a quick low resolution preview, then refine to full resolution with adaptive sampling",
+        default=True,
+    )
+
+    def run_pipeline(self, context, poll_timeout):
+        log("Executing auto painter...")
+        start_trace()
+        self._result = {'CANCELLED'}
+
+        # [0] set render size and samples count
+        render_size = FINAL_SIZE
+        samples_count = FINAL_SAMPLES
+
+        # [1] bake normal map as normals.png + color map as colors.png
+        obj = bpy.context.active_object
+        if obj and obj.type == 'MESH':
+            yield from self.bake_stage(obj, render_size)
+        else:
+            log("No active mesh object selected.")
+            self.report({'ERROR'}, "No active mesh object selected.")
+            return
+        self._color_preset = obj.get(COLOR_PRESET_PROPERTY, 'default')
+
+        # [2] paint and apply a cheap preview from the same bake so a bad seed shows up in seconds
+        if self.progressive:
+            with span('preview', resolution=PREVIEW_SIZE, samples=PREVIEW_SAMPLES):
+                result = yield from self.paint_and_apply(context, obj, PREVIEW_SIZE, PREVIEW_SAMPLES, poll_timeout,
+                                                         output_suffix='_preview')
+            if result != {'FINISHED'}:
+                return
+            log("Preview applied, refining...")
+
+            # [3] refine to full resolution, stopping each pixel once it is below the noise threshold
+            with span('refine', resolution=render_size, noise_threshold=REFINE_NOISE_THRESHOLD):
+                result = yield from self.paint_and_apply(context, obj, render_size, REFINE_MAX_SAMPLES, poll_timeout,
+                                                         noise_threshold=REFINE_NOISE_THRESHOLD)
+        else:
+            result = yield from self.paint_and_apply(context, obj, render_size, samples_count, poll_timeout)
+
+        self._result = result
+
+    def paint_and_apply(self, context, obj, render_size, samples_count, poll_timeout, noise_threshold=None, output_suffix=''):
+        # [0] run auto painter script
+        result = yield from self.auto_paint(render_size, samples_count, poll_timeout, noise_threshold, output_suffix)
+        if result != {'FINISHED'}:
+            return result
+        log("Auto paint finished successfully.")
+
+        # [1] apply texture to normal map
+        yield "Applying normal map"
+        with span('apply_normal'):
+            result = self.apply_texture_to_normal(context, obj, output_suffix)
+        log("Apply final texture finished successfully.")
+
+        # [2] appy color to color map
+        yield "Applying color map"
+        with span('apply_color'):
+            result = self.apply_color_map(context, obj, output_suffix)
+        log("Apply color map finished successfully.")
+        return result
+
+    def auto_paint(self, render_size, samples_count, poll_timeout=None, noise_threshold=None, output_suffix=''):
+            log("Starting auto_paint...")
+
+            # [0] generate a random seed
+            log(f"SEED GENERATED IN ADDON IS {random_seed}")
+
+            # [1] determine the directory of the currently opened Blender file
+            current_blend_dir = os.path.dirname(bpy.data.filepath)
+
+            blender_executable = bpy.app.binary_path
+            operation_script_path = os.path.join(current_blend_dir, 'auto_painter.py')
+
+            blender_file_path = os.path.join(current_blend_dir, 'painter.blend')
+            if not os.path.exists(blender_file_path):
+                log(f"Blender file not found: {blender_file_path}")
+                self.report({'ERROR'}, f"Blender file not found: {blender_file_path}")
+                return {'CANCELLED'}
+
+            if not os.path.exists(operation_script_path):
+                log(f"Operation script not found: {operation_script_path}")
+                self.report({'ERROR'}, f"Operation script not found: {operation_script_path}")
+                return {'CANCELLED'}
+
+            # [2] fit the job into the memory budget: tile the render first, then lower the resolution, else refuse
+            plan = plan_paint_memory(render_size, MEMORY_BUDGET_MB)
+            if plan is None:
+                message = (f"Painting at {render_size}px needs about {estimate_paint_memory(render_size) / 2 ** 20:.0f} MiB "
+                           f"and does not fit the {MEMORY_BUDGET_MB} MiB memory budget at any tiling or resolution")
+                log(message)
+                self.report({'ERROR'}, message)
+                return {'CANCELLED'}
+            if plan != (render_size, 1):
+                log(f"Memory budget {MEMORY_BUDGET_MB} MiB: painting at {plan[0]}px in {plan[1]}x{plan[1]} tiles "
+                    f"instead of {render_size}px")
+                if plan[0] != render_size:
+                    self.report({'WARNING'}, f"Painting at {plan[0]}px to stay within the {MEMORY_BUDGET_MB} MiB memory budget")
+            render_size, render_tiles = plan
+
+            # [3] hand the job to the persistent painter workers
+            job = {
+                'render_resolution': render_size,
+                'render_tiles': render_tiles,
+                'render_workers': 1,
+                # both workers paint at once, so each gets its share of the cores
+                'threads': max(1, (os.cpu_count() or 2) // len(WORKER_TEMPLATES)),
+                'memory_budget': MEMORY_BUDGET_MB,
+                'samples': samples_count,
+                'seed': random_seed,
+                'work_dir': current_blend_dir,
+                'debug_intermediates': DEBUG_INTERMEDIATES,
+                'incremental': INCREMENTAL_PAINT,
+                'noise_threshold': noise_threshold,
+                'output_suffix': output_suffix,
+                'color_preset': self._color_preset,
+                'trace_id': painter_common.trace_id,
+                'trace_file': painter_common.TRACE_FILE,
+            }
+            try:
+                with span('paint_workers'):
+                    results = yield from paint_with_workers(current_blend_dir, job, poll_timeout)
+                for job_type, reply in results.items():
+                    log(f"{job_type} painted to {reply['output_path']} in {reply['duration']:.2f}s")
+                return {'FINISHED'}
+            except PainterJobError as e:
+                log(str(e))
+                self.report({'ERROR'}, str(e))
+                return {'CANCELLED'}
+            except PainterWorkerError as e:
+                log(f"Painter worker unavailable, falling back to a one-shot process: {e}")
+
+            # [4] run Blender from cli
+            command = [
+                blender_executable,
+                "-b", blender_file_path,
+                "--python-exit-code", "1",
+                "-P", operation_script_path,
+                "--", 
+                "render_resolution", str(render_size),
+                "samples", str(samples_count),
+                "seed", str(random_seed),
+                "parallel", "1",
+                "color_preset", self._color_preset,
+                "debug_intermediates", str(int(DEBUG_INTERMEDIATES)),
+                "incremental", str(int(INCREMENTAL_PAINT)),
+                "render_tiles", str(render_tiles),
+                "render_workers", "1",
+                "memory_budget", str(MEMORY_BUDGET_MB)
+            ]
+            if noise_threshold is not None:
+                command += ["noise_threshold", str(noise_threshold)]
+            if output_suffix:
+                command += ["output_suffix", output_suffix]
+
+            result = yield from self.run_painter_process(command, poll_timeout)
+            if result != {'FINISHED'}:
+                return result
+
+            log("Blender auto-painter background process completed successfully!")
+
+            return {'FINISHED'}
+
+    def apply_texture_to_normal(self, context, obj, output_suffix=''):
+            log("Starting apply_texture_to_normal...")
+
+            current_blend_dir = os.path.dirname(bpy.data.filepath)
+            
+            final_image_filename = f'final_{random_seed}{output_suffix}.png'  # Use the seed in the file name
+            final_image_path = os.path.join(current_blend_dir, final_image_filename)
+
+            log(f"Current blend directory: {current_blend_dir}")
+            log(f"Final image path: {final_image_path}")
+
+            if not os.path.exists(final_image_path):
+                log(f"Final image not found: {final_image_path}")
+                self.report({'ERROR'}, f"Final image not found: {final_image_path}")
+                return {'CANCELLED'}
+
+            # [0] check the object the job was started on
+
+            if obj is None:
+                log("No active object selected.")
+                self.report({'ERROR'}, "No active object selected.")
+                return {'CANCELLED'}
+
+            if obj.type != 'MESH':
+                log("Active object is not a mesh.")
+                self.report({'ERROR'}, "Active object is not a mesh.")
+                return {'CANCELLED'}
+
+            # [1] get active material
+            mat = obj.active_material
+
+            if mat is None:
+                log("Active object has no material.")
+                self.report({'ERROR'}, "Active object has no material.")
+                return {'CANCELLED'}
+
+            # [2] use nodes
+            mat.use_nodes = True
+            nodes = mat.node_tree.nodes
+            links = mat.node_tree.links
+
+            # [3] point the material's normal image node at the new image, reusing the node and image from earlier runs
+            try:
+                final_image = load_tagged_image(mat, 'normal', final_image_path)
+            except Exception as e:
+                log(f"Failed to load {final_image_filename}: {e}")
+                self.report({'ERROR'}, f"Failed to load {final_image_filename}: {e}")
+                return {'CANCELLED'}
+            tex_image_node = tagged_node(nodes, 'normal', 'ShaderNodeTexImage', (0, 0))
+            tex_image_node.image = final_image
+            tex_image_node.image.colorspace_settings.name = 'Non-Color'
+            purge_painter_images()
+
+            # [4] find the Normal Map node or create one
+            normal_map_node = None
+            for node in nodes:
+                if node.type == 'NORMAL_MAP':
+                    normal_map_node = node
+                    break
+
+            if normal_map_node is None:
+                normal_map_node = nodes.new(type='ShaderNodeNormalMap')
+                normal_map_node.location = (300, 0)
+
+            normal_map_node.space = 'OBJECT'
+
+            # [5] link Image Texture node to the Normal Map node
+            links.new(tex_image_node.outputs['Color'], normal_map_node.inputs['Color'])
+
+            # [6] find the Principled BSDF node
+            principled_bsdf = None
+            for node in nodes:
+                if node.type == 'BSDF_PRINCIPLED':
+                    principled_bsdf = node
+                    break
+
+            if principled_bsdf is None:
+                log("No Principled BSDF node found in the material.")
+                self.report({'ERROR'}, "No Principled BSDF node found in the material.")
+                return {'CANCELLED'}
+
+            # [7] link the Normal Map node to the Principled BSDF node
+            links.new(normal_map_node.outputs['Normal'], principled_bsdf.inputs['Normal'])
+
+            log("Final image texture applied to the normal input of the selected object's material.")
+            self.report({'INFO'}, f"Final image texture applied {random_seed}.")
+            return {'FINISHED'}
+
+    def apply_color_map(self, context, obj, output_suffix=''):
+            log("Starting apply_color_map...")
+
+            # [0] determine the directory of the currently opened Blender file
+            current_blend_dir = os.path.dirname(bpy.data.filepath)
+            
+            final_image_filename = f'final_colors_{random_seed}{output_suffix}.png'  # use seed in file name
+            final_image_path = os.path.join(current_blend_dir, final_image_filename)
+
+            log(f"Current blend directory: {current_blend_dir}")
+            log(f"Final image path: {final_image_path}")
+
+            if not os.path.exists(final_image_path):
+                log(f"Final image not found: {final_image_path}")
+                self.report({'ERROR'}, f"Final image not found: {final_image_path}")
+                return {'CANCELLED'}
+
+            # [1] check the object the job was started on
+
+            if obj is None:
+                log("No active object selected.")
+                self.report({'ERROR'}, "No active object selected.")
+                return {'CANCELLED'}
+
+            if obj.type != 'MESH':
+                log("Active object is not a mesh.")
+                self.report({'ERROR'}, "Active object is not a mesh.")
+                return {'CANCELLED'}
+
+            # [2] get active material
+            mat = obj.active_material
+
+            if mat is None:
+                log("Active object has no material.")
+                self.report({'ERROR'}, "Active object has no material.")
+                return {'CANCELLED'}
+
+            # [3] use nodes
+            mat.use_nodes = True
+            nodes = mat.node_tree.nodes
+            links = mat.node_tree.links
+
+            # [4] point the material's color image node at the new image, reusing the node and image from earlier runs
+            try:
+                final_image = load_tagged_image(mat, 'color', final_image_path)
+            except Exception as e:
+                log(f"Failed to load {final_image_filename}: {e}")
+                self.report({'ERROR'}, f"Failed to load {final_image_filename}: {e}")
+                return {'CANCELLED'}
+            tex_image_node = tagged_node(nodes, 'color', 'ShaderNodeTexImage', (0, 300))
+            tex_image_node.image = final_image
+            purge_painter_images()
+
+            # [5] find the Principled BSDF node
+            principled_bsdf = None
+            for node in nodes:
+                if node.type == 'BSDF_PRINCIPLED':
+                    principled_bsdf = node
+                    break
+
+            if principled_bsdf is None:
+                log("No Principled BSDF node found in the material.")
+                self.report({'ERROR'}, "No Principled BSDF node found in the material.")
+                return {'CANCELLED'}
+
+            # [6] link the Image Texture node to the Principled BSDF node's Base Color
+            links.new(tex_image_node.outputs['Color'], principled_bsdf.inputs['Base Color'])
+
+            log("Final image color map applied to the base color of the selected object's material.")
+            self.report({'INFO'}, f"Final image color map applied {random_seed}.")
+            return {'FINISHED'}
+
+
+
+class OBJECT_OT_auto_painter_variants(ModalPipelineMixin, bpy.types.Operator):
+    bl_idname = "object.auto_painter_variants"
+    bl_label = "Auto Paint Seed Variants"
+    bl_options = {'REGISTER'}
+
+    variant_count: bpy.props.IntProperty(name="Variants", default=4, min=1, max=64)
+    seeds: bpy.props.StringProperty(name="Seeds", description="Comma separated seeds, overrides Variants", default="")
+    max_parallel: bpy.props.IntProperty(name="Parallel Painters", default=2, min=1, max=32)
+    # set when the dialog was confirmed from the UI, so execute() starts the modal run instead of blocking
+    from_dialog: bpy.props.BoolProperty(default=False, options={'HIDDEN', 'SKIP_SAVE'})
+
+    def invoke(self, context, event):
+        # ask for the seeds, count and parallelism first; the run starts once the dialog is confirmed
+        if paint_progress['running']:
+            self.report({'WARNING'}, "Auto Paint is already running.")
+            return {'CANCELLED'}
+        self.from_dialog = True
+        return context.window_manager.invoke_props_dialog(self)
+
+    def execute(self, context):
+        if self.from_dialog:
+            return self.start_modal(context)
+        return super().execute(context)
+
+    def run_pipeline(self, context, poll_timeout):
+        log("Executing auto painter seed sweep...")
+        start_trace()
+        self._result = {'CANCELLED'}
+
+        # [0] set render size and samples count
+        render_size = FINAL_SIZE
+        samples_count = FINAL_SAMPLES
+
+        # [1] pick the seeds for this batch
+        if self.seeds.strip():
+            seeds = [seed.strip() for seed in self.seeds.split(',') if seed.strip()]
+        else:
+            seeds = [str(seed) for seed in random.sample(range(100000), self.variant_count)]
+        log(f"Seeds for this batch: {seeds}")
+
+        # [2] bake once for the whole batch
+        obj = bpy.context.active_object
+        if obj and obj.type == 'MESH':
+            yield from self.bake_stage(obj, render_size)
+        else:
+            log("No active mesh object selected.")
+            self.report({'ERROR'}, "No active mesh object selected.")
+            return
+
+        # [3] paint every seed in one background Blender that fans out to bounded workers
+        current_blend_dir = os.path.dirname(bpy.data.filepath)
+        manifest_path = os.path.join(current_blend_dir, f'variants_{int(time.time())}', 'manifest.json')
+        command = [
+            bpy.app.binary_path,
+            "-b", os.path.join(current_blend_dir, 'painter.blend'),
+            "--python-exit-code", "1",
+            "-P", os.path.join(current_blend_dir, 'auto_painter.py'),
+            "--",
+            "render_resolution", str(render_size),
+            "samples", str(samples_count),
+            "seed", seeds[0],
+            "seeds", ','.join(seeds),
+            "workers", str(self.max_parallel),
+            "manifest", manifest_path,
+            "color_preset", obj.get(COLOR_PRESET_PROPERTY, 'default'),
+            "debug_intermediates", str(int(DEBUG_INTERMEDIATES)),
+            "memory_budget", str(MEMORY_BUDGET_MB)
+        ]
+        result = yield from self.run_painter_process(command, poll_timeout)
+        if result != {'FINISHED'}:
+            return
+
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        log(f"Seed sweep finished: {manifest['variants_per_minute']:.2f} variants/min")
+        self.report({'INFO'}, f"Painted {len(seeds)} variants, manifest: {manifest_path}")
+        self._result = {'FINISHED'}
+
+class OBJECT_OT_auto_painter_cancel(bpy.types.Operator):
+    bl_idname = "object.auto_painter_cancel"
+    bl_label = "Cancel Auto Paint"
+
+    def execute(self, context):
+        paint_progress['cancel_requested'] = True
+        return {'FINISHED'}
+
+# --------------------------------------------
+
+class OBJECT_PT_auto_painter_panel(bpy.types.Panel):
+    bl_idname = "OBJECT_PT_auto_painter_panel"
+    bl_label = "Auto Painter"
+    bl_space_type = 'VIEW_3D'
+    bl_region_type = 'UI'
+    bl_category = 'Auto Painter'
+
+    def draw(self, context):
+        layout = self.layout
+        obj = context.active_object
+
+        layout.label(text="Auto Painter")
+
+        if paint_progress['running']:
+            layout.label(text=f"Running: {paint_progress['stage']}")
+            if paint_progress['detail']:
+                layout.label(text=paint_progress['detail'])
+            layout.operator("object.auto_painter_cancel", text="Cancel")
+        elif obj:
+            layout.label(text=f"Selected: {obj.name}")
+            layout.operator("object.auto_painter", text="Auto Paint")
+            layout.operator("object.auto_painter_variants", text="Paint Seed Variants")
+        else:
+            layout.label(text="No object selected")
+
+# ------------------ HEADLESS ------------------
+
+def run_headless(args):
+    # blender -b <asset.blend> -P auto_painter_addon/__init__.py -- headless bake <object> <out_dir> [render_resolution N] [cache_dir DIR]
+    # writes normals.npy and colors.npy for one object into out_dir, ready for auto_painter.py work_dir
+    command = args[args.index('headless') + 1]
+    if command != 'bake':
+        raise ValueError(f"Unknown headless command: {command}")
+    object_name = args[args.index('bake') + 1]
+    out_dir = args[args.index('bake') + 2]
+    render_size = int(args[args.index('render_resolution') + 1]) if 'render_resolution' in args else FINAL_SIZE
+    cache_dir = args[args.index('cache_dir') + 1] if 'cache_dir' in args else None
+
+    # [0] make the object the selected, active one; baking works on the selection
+    obj = bpy.data.objects.get(object_name)
+    if obj is None or obj.type != 'MESH':
+        log(f"No mesh object named {object_name} in {bpy.data.filepath}")
+        sys.exit(1)
+    for other in bpy.context.view_layer.objects:
+        other.select_set(False)
+    bpy.context.view_layer.objects.active = obj
+    obj.select_set(True)
+    bpy.context.scene.render.engine = 'CYCLES'
+
+    # [1] bake both maps into the job's own directory
+    os.makedirs(out_dir, exist_ok=True)
+    try:
+        for stage in bake_maps(obj, out_dir, render_size, PAINT_BAKE_MAPS, cache_dir, DEBUG_INTERMEDIATES):
+            log(stage)
+    finally:
+        flush_trace()
+    log("Bake times: " + ", ".join(f"{map_type} {seconds:.2f}s" for map_type, seconds in bake_map_times.items()))
+    log(f"Headless bake of {object_name} finished, bake cache: {bake_cache_stats['hits']} hits, {bake_cache_stats['misses']} misses")
+
+def register():
+    bpy.utils.register_class(OBJECT_OT_auto_painter)
+    bpy.utils.register_class(OBJECT_OT_auto_painter_variants)
+    bpy.utils.register_class(OBJECT_OT_auto_painter_cancel)
+    bpy.utils.register_class(OBJECT_PT_auto_painter_panel)
+
+def unregister():
+    stop_painter_workers()
+    release_bake_targets()
+    bpy.utils.unregister_class(OBJECT_OT_auto_painter)
+    bpy.utils.unregister_class(OBJECT_OT_auto_painter_variants)
+    bpy.utils.unregister_class(OBJECT_OT_auto_painter_cancel)
+    bpy.utils.unregister_class(OBJECT_PT_auto_painter_panel)
+
+if __name__ == "__main__":
+    cli_args = sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else []
+    if 'headless' in cli_args:
+        run_headless(cli_args)
+    else:
+        register()
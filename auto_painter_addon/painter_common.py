@@ -0,0 +1,99 @@
+import os
+import json
+import time
+import contextlib
+import threading
+import tempfile
+
+# shared by the add-on (this package) and auto_painter.py; the painters find it through AUTO_PAINTER_COMMON_DIR,
+# set by the add-on, or in the auto_painter_addon folder next to auto_painter.py
+
+# the temp dir exists and is writable on every machine; AUTO_PAINTER_LOG puts the log (and the trace) elsewhere
+LOG_FILE = os.environ.get('AUTO_PAINTER_LOG') or os.path.join(tempfile.gettempdir(), 'auto_painter.log')
+
+# ------------------ TRACING ------------------
+
+# the add-on passes its trace id and file down so child spans land in the same trace
+TRACE_FILE = os.environ.get('AUTO_PAINTER_TRACE_FILE') or os.path.join(os.path.dirname(LOG_FILE), 'auto_painter_trace.jsonl')
+trace_id = os.environ.get('AUTO_PAINTER_TRACE_ID', '')
+trace_events = []
+# set by the painter to (open, close) so spans on the main thread also record their peak memory
+memory_span_hooks = None
+
+@contextlib.contextmanager
+def span(name, **args):
+    # one Chrome trace "complete" event per span, buffered until flush_trace()
+    timestamp = time.time()
+    start = time.perf_counter()
+    main_thread = threading.current_thread() is threading.main_thread()
+    hooks = memory_span_hooks if main_thread else None
+    if hooks is not None:
+        peaks = hooks[0]()
+    try:
+        yield
+    finally:
+        if hooks is not None:
+            args = dict(args, **hooks[1](peaks))
+        trace_events.append({
+            'name': name,
+            'ph': 'X',
+            'ts': int(timestamp * 1e6),
+            'dur': int((time.perf_counter() - start) * 1e6),
+            'pid': os.getpid(),
+            # spans from worker threads get their own track
+            'tid': 0 if main_thread else threading.get_ident(),
+            'args': dict(args, trace_id=trace_id),
+        })
+
+def flush_trace():
+    # each line is a Chrome trace event; wrap the lines in [] to open them in chrome://tracing or Perfetto
+    if not trace_events:
+        return
+    os.makedirs(os.path.dirname(TRACE_FILE) or '.', exist_ok=True)
+    with open(TRACE_FILE, 'a') as f:
+        f.write(''.join(json.dumps(event) + '\n' for event in trace_events))
+    trace_events.clear()
+
+def trace_child_env():
+    return dict(os.environ, AUTO_PAINTER_TRACE_ID=trace_id, AUTO_PAINTER_TRACE_FILE=TRACE_FILE,
+                AUTO_PAINTER_SPAWN_TIME=repr(time.time()))
+
+def trace_summary(summary_trace_id):
+    # per-stage totals for one trace, including spans written by child processes
+    totals = {}
+    peaks = {}
+    if os.path.exists(TRACE_FILE):
+        with open(TRACE_FILE) as f:
+            for line in f:
+                event = json.loads(line)
+                if event['args'].get('trace_id') != summary_trace_id:
+                    continue
+                count, total, longest = totals.get(event['name'], (0, 0, 0))
+                totals[event['name']] = (count + 1, total + event['dur'], max(longest, event['dur']))
+                peaks[event['name']] = max(peaks.get(event['name'], 0), event['args'].get('peak_rss_mib', 0))
+
+    lines = [f"{'stage':<24}{'count':>7}{'total s':>10}{'max s':>10}{'peak MiB':>10}"]
+    for name, (count, total, longest) in sorted(totals.items(), key=lambda item: -item[1][1]):
+        lines.append(f"{name:<24}{count:>7}{total / 1e6:>10.3f}{longest / 1e6:>10.3f}{peaks[name]:>10.0f}")
+    return "\n".join(lines)
+
+# ------------------ MEMORY COST MODEL ------------------
+
+# rough cost model of one paint job, in bytes: Blender with the template and a cached color LUT loaded,
+# plus per pixel the template image (its packed TIFF, Blender's byte buffer and Cycles' copy), Cycles' float
+# render buffers and the uint8 post-processing buffers; the measured peaks in the job log are what to tune it against
+PAINTER_BASE_MEMORY = 512 * 2 ** 20
+TEXTURE_BYTES_PER_PIXEL = 12
+RENDER_BYTES_PER_PIXEL = 48
+POST_BYTES_PER_PIXEL = 16
+
+def estimate_paint_memory(resolution, render_tiles=1, render_workers=0):
+    # render_workers 0 means one tile worker per core, as the painter does by default
+    pixels = resolution * resolution
+    painter = PAINTER_BASE_MEMORY + pixels * (TEXTURE_BYTES_PER_PIXEL + POST_BYTES_PER_PIXEL)
+    if render_tiles <= 1:
+        return painter + pixels * RENDER_BYTES_PER_PIXEL
+    # each tile worker loads the scene and its textures, but holds the render buffers of one tile at a time
+    workers = min(render_workers or (os.cpu_count() or 1), render_tiles ** 2)
+    worker = PAINTER_BASE_MEMORY + pixels * TEXTURE_BYTES_PER_PIXEL + pixels * RENDER_BYTES_PER_PIXEL // render_tiles ** 2
+    return painter + workers * worker
@@ -0,0 +1,199 @@
+import os
+import sys
+import time
+import json
+import random
+import shutil
+import argparse
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# paints a library of assets without the UI:
+#   python batch_paint.py manifest.json --blender /path/to/blender --output painted/ --workers 4
+# the manifest is a JSON list (or {"jobs": [...]}) of entries like
+#   {"blend": "assets/crate.blend", "object": "Crate", "seed": 42, "color_preset": "muted"}
+# where everything but blend and object is optional
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_RESOLUTION = 4096
+DEFAULT_SAMPLES = 100
+
+# ------------------ MANIFEST ------------------
+
+def load_manifest(path):
+    with open(path) as f:
+        manifest = json.load(f)
+    jobs = manifest['jobs'] if isinstance(manifest, dict) else manifest
+    base_dir = os.path.dirname(os.path.abspath(path))
+    for index, job in enumerate(jobs):
+        if 'blend' not in job or 'object' not in job:
+            raise ValueError(f"Manifest entry {index} needs 'blend' and 'object'")
+        job['blend'] = os.path.join(base_dir, job['blend'])
+        job.setdefault('seed', random.randint(0, 99999))
+        stem = os.path.splitext(os.path.basename(job['blend']))[0]
+        job['name'] = f"{index:03d}_{stem}_{job['object']}".replace(os.sep, '_')
+    return jobs
+
+# ------------------ JOBS ------------------
+
+def run_blender(command, env, log_path):
+    # Blender's own output goes to the job's log, so a failed attempt can be read afterwards;
+    # commands pass --python-exit-code, without which Blender exits 0 even when the script raised
+    with open(log_path, 'a') as log_file:
+        log_file.write(f"$ {' '.join(command)}\n")
+        log_file.flush()
+        return subprocess.run(command, stdout=log_file, stderr=subprocess.STDOUT, env=env).returncode
+
+def paint_asset(job, options, attempt):
+    job_dir = os.path.join(options.output, job['name'])
+    os.makedirs(job_dir, exist_ok=True)
+    log_path = os.path.join(job_dir, f'attempt_{attempt}.log')
+    env = dict(os.environ,
+               AUTO_PAINTER_LOG=os.path.join(job_dir, 'painter.log'),
+               AUTO_PAINTER_TRACE_FILE=os.path.join(job_dir, 'trace.jsonl'),
+               AUTO_PAINTER_TRACE_ID=f"{job['name']}-{attempt}")
+    resolution = job.get('resolution', options.resolution)
+    samples = job.get('samples', options.samples)
+    timings = {}
+    outputs = [os.path.join(job_dir, f"final_{job['seed']}.png"), os.path.join(job_dir, f"final_colors_{job['seed']}.png")]
+    # finals left by an earlier attempt or run must not pass for this attempt's output
+    for path in outputs:
+        if os.path.exists(path):
+            os.remove(path)
+
+    # [0] bake the asset's maps into its own directory
+    start = time.perf_counter()
+    bake = [
+        options.blender, "-b", job['blend'],
+        "--python-exit-code", "1",
+        "-P", os.path.join(options.painter_dir, 'auto_painter_addon', '__init__.py'),
+        "--",
+        "headless", "bake", job['object'], job_dir,
+        "render_resolution", str(resolution),
+        "cache_dir", os.path.join(options.output, 'bake_cache'),
+    ]
+    if run_blender(bake, env, log_path) != 0:
+        raise RuntimeError(f"bake failed, see {log_path}")
+    timings['bake'] = time.perf_counter() - start
+
+    # [1] paint and post-process both maps with the templates, reading and writing only the job directory
+    start = time.perf_counter()
+    paint = [
+        options.blender, "-b", os.path.join(options.painter_dir, 'painter.blend'),
+        "--python-exit-code", "1",
+        "-P", os.path.join(options.painter_dir, 'auto_painter.py'),
+        "--",
+        "render_resolution", str(resolution),
+        "samples", str(samples),
+        "seed", str(job['seed']),
+        "work_dir", job_dir,
+        "threads", str(options.threads),
+        "color_preset", job.get('color_preset', 'default'),
+        "memory_budget", str(options.memory_budget),
+    ]
+    if run_blender(paint, env, log_path) != 0:
+        raise RuntimeError(f"paint failed, see {log_path}")
+    timings['paint'] = time.perf_counter() - start
+
+    missing = [path for path in outputs if not os.path.exists(path)]
+    if missing:
+        raise RuntimeError(f"paint produced no {', '.join(os.path.basename(path) for path in missing)}")
+
+    # the baked inputs are only needed while painting
+    if not options.keep_bakes:
+        for name in ('normals.npy', 'colors.npy'):
+            if os.path.exists(os.path.join(job_dir, name)):
+                os.remove(os.path.join(job_dir, name))
+    return {'outputs': outputs, 'timings': timings}
+
+def run_job(job, options):
+    # retry a failed asset up to options.retries more times
+    result = {'name': job['name'], 'blend': job['blend'], 'object': job['object'], 'seed': job['seed'], 'errors': []}
+    start = time.perf_counter()
+    for attempt in range(options.retries + 1):
+        try:
+            result.update(paint_asset(job, options, attempt))
+            result['status'] = 'ok'
+            break
+        except Exception as e:
+            result['errors'].append(str(e))
+            print(f"{job['name']}: attempt {attempt + 1} failed: {e}")
+    else:
+        result['status'] = 'failed'
+    result['attempts'] = attempt + 1
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+# ------------------ REPORT ------------------
+
+def write_report(results, wall_time, options):
+    succeeded = [result for result in results if result['status'] == 'ok']
+    report = {
+        'workers': options.workers,
+        'threads_per_worker': options.threads,
+        'wall_time': wall_time,
+        'assets': len(results),
+        'succeeded': len(succeeded),
+        'failed': len(results) - len(succeeded),
+        'retried': sum(1 for result in results if result['attempts'] > 1),
+        'assets_per_minute': len(succeeded) * 60.0 / wall_time if wall_time > 0 else 0.0,
+        'jobs': results,
+    }
+    for stage in ('bake', 'paint'):
+        times = [result['timings'][stage] for result in succeeded]
+        report[f'mean_{stage}_seconds'] = sum(times) / len(times) if times else 0.0
+
+    report_path = os.path.join(options.output, 'report.json')
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{report['succeeded']}/{report['assets']} assets painted in {wall_time:.1f}s "
+          f"({report['assets_per_minute']:.2f} assets/min, {report['retried']} retried)")
+    print(f"mean bake {report['mean_bake_seconds']:.1f}s, mean paint {report['mean_paint_seconds']:.1f}s")
+    for result in results:
+        if result['status'] != 'ok':
+            print(f"FAILED {result['name']}: {result['errors'][-1]}")
+    print(f"report: {report_path}")
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Bake and auto paint a manifest of assets with a pool of background Blenders.")
+    parser.add_argument('manifest', help="JSON list of {blend, object[, seed, resolution, samples, color_preset]}")
+    parser.add_argument('--blender', default=shutil.which('blender') or 'blender', help="Blender executable")
+    parser.add_argument('--painter-dir', default=SCRIPT_DIR, help="directory with auto_painter_addon/, auto_painter.py and the painter templates")
+    parser.add_argument('--output', default='painted', help="one sub-directory per asset is created here")
+    parser.add_argument('--workers', type=int, default=2, help="assets painted at the same time")
+    parser.add_argument('--threads', type=int, default=0, help="render threads per worker, 0 splits the cores evenly")
+    parser.add_argument('--retries', type=int, default=1, help="extra attempts for a failed asset")
+    parser.add_argument('--resolution', type=int, default=DEFAULT_RESOLUTION)
+    parser.add_argument('--samples', type=int, default=DEFAULT_SAMPLES)
+    parser.add_argument('--memory-budget', type=int, default=0,
+                        help="MiB one paint job may use; jobs estimated above it fail up front instead of being OOM-killed")
+    parser.add_argument('--keep-bakes', action='store_true', help="keep normals.npy / colors.npy in the asset directories")
+    options = parser.parse_args()
+
+    options.output = os.path.abspath(options.output)
+    options.painter_dir = os.path.abspath(options.painter_dir)
+    if options.threads <= 0:
+        options.threads = max(1, (os.cpu_count() or options.workers) // options.workers)
+    os.makedirs(options.output, exist_ok=True)
+
+    jobs = load_manifest(options.manifest)
+    print(f"Painting {len(jobs)} assets with {options.workers} workers, {options.threads} threads each")
+
+    # each pool thread only waits on its Blender processes, so the pool size bounds the Blenders running
+    start = time.perf_counter()
+    results = []
+    with ThreadPoolExecutor(max_workers=options.workers) as pool:
+        futures = [pool.submit(run_job, job, options) for job in jobs]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            print(f"[{len(results)}/{len(jobs)}] {result['name']}: {result['status']} in {result['seconds']:.1f}s")
+    results.sort(key=lambda result: result['name'])
+
+    report = write_report(results, time.perf_counter() - start, options)
+    return 0 if report['failed'] == 0 else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,220 @@
+import os
+import sys
+import time
+import json
+import types
+import argparse
+import tempfile
+import tracemalloc
+
+# the post-render stages only need numpy and cv2, so a bare module stands in for bpy
+sys.modules.setdefault('bpy', types.ModuleType('bpy'))
+os.environ.setdefault('AUTO_PAINTER_LOG', os.path.join(tempfile.gettempdir(), 'auto_painter_benchmark.log'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import cv2
+import numpy as np
+import auto_painter
+
+DEFAULT_SIZES = [512, 1024, 2048, 4096]
+DEFAULT_THRESHOLD = 0.15
+
+# ------------------ SYNTHETIC MAPS ------------------
+
+def coverage_mask(size, coverage, rng):
+    # rectangular UV islands on a black background, roughly `coverage` of the texture
+    mask = np.zeros((size, size), dtype=bool)
+    while mask.mean() < coverage:
+        w, h = rng.integers(size // 16, size // 4, size=2)
+        x, y = rng.integers(0, size - w), rng.integers(0, size - h)
+        mask[y:y + h, x:x + w] = True
+    return mask
+
+def synthetic_normal_maps(size, coverage=0.5, seed=0):
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:size, 0:size].astype(np.float32) / size
+
+    # smooth tangent-space normals, then a noisy "painted" copy
+    nx = 0.4 * np.sin(x * 12.0) * np.cos(y * 7.0)
+    ny = 0.4 * np.cos(x * 5.0) * np.sin(y * 11.0)
+    nz = np.sqrt(np.clip(1.0 - nx ** 2 - ny ** 2, 0.0, 1.0))
+    normals = np.stack([nz, ny, nx], axis=-1)  # BGR order, as cv2 loads it
+    original = ((normals * 0.5 + 0.5) * 255).astype(np.uint8)
+    painted = np.clip(original.astype(np.int16) + rng.integers(-40, 40, original.shape), 0, 255).astype(np.uint8)
+
+    mask = coverage_mask(size, coverage, rng)
+    original[~mask] = 0
+    return original, painted
+
+def synthetic_color_maps(size, coverage=0.5, seed=0):
+    rng = np.random.default_rng(seed + 1)
+    mask = coverage_mask(size, coverage, rng)
+    baked = rng.integers(0, 256, (size, size, 3), dtype=np.uint8)
+    baked[~mask] = 0
+    rendered = rng.integers(0, 256, (size, size, 4), dtype=np.uint8)
+    return baked, rendered
+
+# ------------------ STAGES ------------------
+
+def stage_mask(maps):
+    original, painted = maps['normal']
+    modified = painted.copy()
+    auto_painter.apply_black_mask(original, modified)
+
+def stage_correction(maps):
+    original, painted = maps['normal']
+    auto_painter.correct_colors_advanced(original, painted)
+
+def stage_alpha_strip(maps):
+    baked, _ = maps['color']
+    auto_painter.strip_black_to_alpha(baked)
+
+DEFAULT_CHAIN = auto_painter.COLOR_PRESETS['default']
+LUT_CACHE_DIR = os.path.join(tempfile.gettempdir(), 'auto_painter_benchmark_luts')
+
+def stage_hue_value(maps):
+    # direct HSV round trip of the default preset
+    _, rendered = maps['color']
+    adjusted = auto_painter.adjust_colors(np.ascontiguousarray(rendered[..., :3]), DEFAULT_CHAIN)
+    np.dstack((adjusted, rendered[..., 3]))
+
+def stage_color_lut(maps):
+    # the painter's path: compiled once per chain, then one lookup per pixel
+    _, rendered = maps['color']
+    lut = auto_painter.load_color_lut(DEFAULT_CHAIN, LUT_CACHE_DIR)
+    adjusted = rendered.copy()
+    auto_painter.apply_color_lut(lut, rendered, adjusted)
+
+def stage_vector_correction(maps):
+    original, painted = maps['normal']
+    auto_painter.correct_colors_advanced(original, painted, 'vector')
+
+def stage_coverage_correction(maps):
+    # the normal path as painted: index the bake, then correct occupied tiles only
+    original, painted = maps['normal']
+    tile_size = auto_painter.COVERAGE_TILE
+    coverage = auto_painter.build_coverage_index(original, tile_size)
+    result = np.zeros_like(original)
+    for block in auto_painter.iter_blocks(original.shape, coverage, tile_size, auto_painter.STRIP_ROWS):
+        result[block] = auto_painter.correct_colors_advanced(original[block], painted[block])
+
+WRITE_DIR = tempfile.gettempdir()
+
+def write_png(image, artifact):
+    path = os.path.join(WRITE_DIR, f'auto_painter_benchmark_{artifact}.png')
+    cv2.imwrite(path, image, auto_painter.image_write_params(path, auto_painter.PNG_COMPRESSION[artifact]))
+
+def stage_intermediate_write(maps):
+    _, painted = maps['normal']
+    write_png(painted, 'intermediate')
+
+def stage_final_write(maps):
+    # the smooth bake is where the deliverable level pays off
+    original, _ = maps['normal']
+    write_png(original, 'final')
+
+STAGES = {
+    'mask': stage_mask,
+    'correct_colors_advanced': stage_correction,
+    'vector_correction': stage_vector_correction,
+    'coverage_correction': stage_coverage_correction,
+    'alpha_strip': stage_alpha_strip,
+    'hue_value_shift': stage_hue_value,
+    'color_lut': stage_color_lut,
+    'intermediate_write': stage_intermediate_write,
+    'final_write': stage_final_write,
+}
+
+def measure(stage, maps, repeats):
+    # best-of-N wall time, then one traced run for the peak of numpy/cv2 allocations
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        stage(maps)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    stage(maps)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+def run_benchmarks(sizes, stages, repeats):
+    results = {}
+    for size in sizes:
+        maps = {
+            'normal': synthetic_normal_maps(size),
+            'color': synthetic_color_maps(size),
+        }
+        for name in stages:
+            seconds, peak = measure(STAGES[name], maps, repeats)
+            results[f"{name}@{size}"] = {'seconds': seconds, 'peak_bytes': peak}
+            print(f"{name:<26}{size:>6}  {seconds * 1000:>10.2f} ms  {peak / 2 ** 20:>9.1f} MiB")
+        del maps
+    return results
+
+# ------------------ BASELINE ------------------
+
+def compare(results, baseline, threshold):
+    regressions = []
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+        for metric in ('seconds', 'peak_bytes'):
+            before = baseline[key][metric]
+            if before > 0 and result[metric] > before * (1 + threshold):
+                regressions.append(f"{key} {metric}: {before:.4g} -> {result[metric]:.4g} "
+                                   f"(+{(result[metric] / before - 1) * 100:.1f}%)")
+    return regressions
+
+def check_parity(size=64):
+    # the vectorized correction must match the reference loop byte for byte
+    original, painted = synthetic_normal_maps(size)
+    loop = auto_painter.correct_colors_advanced(original, painted, 'loop')
+    vectorized = auto_painter.correct_colors_advanced(original, painted, 'vectorized')
+    mismatches = int(np.count_nonzero(loop != vectorized))
+    print(f"parity check at {size}x{size}: {mismatches} mismatching values")
+
+    # and the compiled color LUT must match the direct adjustment chain
+    _, rendered = synthetic_color_maps(size)
+    direct = auto_painter.adjust_colors(np.ascontiguousarray(rendered[..., :3]), DEFAULT_CHAIN)
+    looked_up = rendered.copy()
+    auto_painter.apply_color_lut(auto_painter.load_color_lut(DEFAULT_CHAIN, LUT_CACHE_DIR), rendered, looked_up)
+    lut_mismatches = int(np.count_nonzero(direct != looked_up[..., :3]))
+    print(f"color LUT parity at {size}x{size}: {lut_mismatches} mismatching values")
+    return mismatches == 0 and lut_mismatches == 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the post-render image stages of auto_painter.py without Blender.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="square map sizes, e.g. 512 2048 8192")
+    parser.add_argument('--stages', nargs='+', choices=sorted(STAGES), default=list(STAGES))
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--save-baseline', metavar='PATH', help="write the results as a new baseline")
+    parser.add_argument('--baseline', metavar='PATH', help="compare against a saved baseline")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help="allowed slowdown/growth before flagging, as a fraction")
+    parser.add_argument('--check-parity', action='store_true', help="also check vectorized vs loop correction and the color LUT")
+    options = parser.parse_args()
+
+    if options.check_parity and not check_parity():
+        return 1
+
+    results = run_benchmarks(options.sizes, options.stages, options.repeats)
+
+    if options.save_baseline:
+        with open(options.save_baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"baseline saved to {options.save_baseline}")
+
+    if options.baseline:
+        with open(options.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, options.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+        print(f"no regressions above {options.threshold * 100:.0f}%")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,9 @@
+import os
+import sys
+import types
+import tempfile
+
+# the image stages only need numpy and cv2, so a bare module stands in for bpy
+sys.modules.setdefault('bpy', types.ModuleType('bpy'))
+os.environ.setdefault('AUTO_PAINTER_LOG', os.path.join(tempfile.gettempdir(), 'auto_painter_tests.log'))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
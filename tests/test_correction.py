@@ -0,0 +1,46 @@
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+import auto_painter
+from benchmark import synthetic_normal_maps
+
+# a real bake to check against: a 128px crop of Suzanne's normal bake from demo.blend (headless bake at 512px);
+# AUTO_PAINTER_TEST_NORMAL_MAP points it at another bake, e.g. normals.png from a debug_intermediates run
+REAL_NORMAL_MAP = os.environ.get('AUTO_PAINTER_TEST_NORMAL_MAP',
+                                 os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'normals.png'))
+# the reference loop is per pixel, so real maps are cut down to this size first
+REAL_MAP_SIZE = 128
+
+def assert_parity(original, painted):
+    loop = auto_painter.correct_colors_advanced(original, painted, 'loop')
+    vectorized = auto_painter.correct_colors_advanced(original, painted, 'vectorized')
+    assert np.count_nonzero(loop != vectorized) == 0
+
+def perturb(original, rng, amount=40):
+    return np.clip(original.astype(np.int16) + rng.integers(-amount, amount, original.shape), 0, 255).astype(np.uint8)
+
+def test_parity_random():
+    rng = np.random.default_rng(0)
+    original = rng.integers(0, 256, (64, 64, 3), dtype=np.uint8)
+    painted = rng.integers(0, 256, (64, 64, 3), dtype=np.uint8)
+    assert_parity(original, painted)
+
+def test_parity_perturbed():
+    original, painted = synthetic_normal_maps(64)
+    assert_parity(original, painted)
+
+def test_parity_half_black():
+    rng = np.random.default_rng(1)
+    original, _ = synthetic_normal_maps(64, coverage=0.9)
+    original[:, :32] = 0
+    assert_parity(original, perturb(original, rng))
+
+def test_parity_real_normal_map():
+    if not os.path.exists(REAL_NORMAL_MAP):
+        pytest.skip(f"no baked normal map at {REAL_NORMAL_MAP}")
+    original = cv2.imread(REAL_NORMAL_MAP, cv2.IMREAD_COLOR)
+    original = cv2.resize(original, (REAL_MAP_SIZE, REAL_MAP_SIZE), interpolation=cv2.INTER_NEAREST)
+    assert_parity(original, perturb(original, np.random.default_rng(2)))
@@ -0,0 +1,57 @@
+import types
+
+import numpy as np
+import pytest
+
+import auto_painter
+
+TILE_SIZE = 128
+# not a multiple of TILE_SIZE, so the last tile row and column are cut short
+RESOLUTION = 3000
+
+def fake_scene(monkeypatch):
+    render = types.SimpleNamespace(use_border=False, use_crop_to_border=True,
+                                   border_min_x=0, border_max_x=1, border_min_y=0, border_max_y=1)
+    monkeypatch.setattr(auto_painter.bpy, 'context', types.SimpleNamespace(scene=types.SimpleNamespace(render=render)), raising=False)
+    return render
+
+def border_pixels(render):
+    # (left, right, top, bottom) in pixels from the top left, as cv2 indexes the render
+    return (render.border_min_x * RESOLUTION, render.border_max_x * RESOLUTION,
+            (1 - render.border_max_y) * RESOLUTION, (1 - render.border_min_y) * RESOLUTION)
+
+def bake_with_pixels(pixels):
+    image = np.zeros((RESOLUTION, RESOLUTION, 3), dtype=np.uint8)
+    for y, x in pixels:
+        image[y, x] = 255
+    return image
+
+def test_render_border_covers_occupied_tiles(monkeypatch):
+    render = fake_scene(monkeypatch)
+    coverage = auto_painter.build_coverage_index(bake_with_pixels([(1400, 1400), (1500, 1300)]), TILE_SIZE)
+    auto_painter.set_render_border(coverage, TILE_SIZE, RESOLUTION)
+
+    assert render.use_border
+    # the occupied tiles span pixels 1280..1407 across and 1280..1535 down
+    assert border_pixels(render) == pytest.approx((1280, 1408, 1280, 1536))
+
+def test_render_border_stops_at_the_frame(monkeypatch):
+    render = fake_scene(monkeypatch)
+    coverage = auto_painter.build_coverage_index(bake_with_pixels([(2999, 2999), (0, 2990)]), TILE_SIZE)
+    auto_painter.set_render_border(coverage, TILE_SIZE, RESOLUTION)
+
+    assert border_pixels(render) == pytest.approx((2944, 3000, 0, 3000))
+
+def test_tile_regions_keep_regions_with_occupied_pixels():
+    # coverage row 11 holds pixels 1408..1535, which straddle the 2x2 grid's split at 1500,
+    # so both regions it overlaps are rendered
+    coverage = auto_painter.build_coverage_index(bake_with_pixels([(1510, 100)]), TILE_SIZE)
+    regions = auto_painter.tile_regions(RESOLUTION, 2, coverage, TILE_SIZE)
+
+    assert regions == [(0, 1500, 0, 1500), (1500, 3000, 0, 1500)]
+
+def test_tile_regions_skip_empty_regions():
+    coverage = auto_painter.build_coverage_index(bake_with_pixels([(10, 10)]), TILE_SIZE)
+    regions = auto_painter.tile_regions(RESOLUTION, 2, coverage, TILE_SIZE)
+
+    assert regions == [(0, 1500, 0, 1500)]